@@ -1,6 +1,8 @@
 import os
 from pathlib import Path
 
+from social.db import database_settings
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'dev-secret-key-change-me')
@@ -20,6 +22,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'social.profiling.ProfilingMiddleware',
+    'social.db.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -43,19 +47,37 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'social.context_processors.inbox',
+                'social.context_processors.notification_badge',
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'developer_portfolio.wsgi.application'
+ASGI_APPLICATION = 'developer_portfolio.asgi.application'
+
+# DATABASE_URL (postgres://... or sqlite:///...) and an optional comma-separated
+# DATABASE_REPLICA_URLS; see social/db.py. PostgreSQL needs psycopg installed.
+DATABASES = database_settings(os.environ, BASE_DIR)
+DATABASE_ROUTERS = ['social.db.ReplicaRouter']
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Set REDIS_URL to share one cache between processes (needs the redis package)
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'social',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
     }
-}
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -77,3 +99,44 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_REDIRECT_URL = 'feed'
 LOGOUT_REDIRECT_URL = 'login'
+
+# Pub/sub backend that pushes chat messages to open conversations
+SOCIAL_REALTIME_BROKER = os.environ.get(
+    'SOCIAL_REALTIME_BROKER', 'social.realtime.InMemoryBroker'
+)
+
+# Per-view query/timing instrumentation (see social/profiling.py), on in development
+SOCIAL_PROFILING = os.environ.get('SOCIAL_PROFILING', '1' if DEBUG else '0') == '1'
+SOCIAL_PROFILE_MEMORY = os.environ.get('SOCIAL_PROFILE_MEMORY', '0') == '1'
+SOCIAL_QUERY_BUDGET_STRICT = os.environ.get('SOCIAL_QUERY_BUDGET_STRICT', '0') == '1'
+
+# Storage behind social.cache: SharedBackend uses CACHES['default'];
+# social.cache.LocalLRUBackend keeps a bounded per-process LRU instead
+SOCIAL_CACHE_BACKEND = os.environ.get('SOCIAL_CACHE_BACKEND', 'social.cache.SharedBackend')
+SOCIAL_CACHE_BETA = float(os.environ.get('SOCIAL_CACHE_BETA', '1.0'))
+
+# Seconds a browser keeps reading from the primary after it writes, to cover replica lag
+SOCIAL_REPLICA_STICKY_SECONDS = int(os.environ.get('SOCIAL_REPLICA_STICKY_SECONDS', '10'))
+# How long SQLite waits for a competing writer before raising "database is locked"
+SOCIAL_SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SOCIAL_SQLITE_BUSY_TIMEOUT_MS', '5000'))
+
+# Serve the feed, inbox and chat thread with async views; enable when running under ASGI
+SOCIAL_ASYNC_VIEWS = os.environ.get('SOCIAL_ASYNC_VIEWS', '0') == '1'
+
+# Run queued tasks inline instead of leaving them for `manage.py run_tasks`
+SOCIAL_TASKS_EAGER = os.environ.get('SOCIAL_TASKS_EAGER', '0') == '1'
+
+# Longest a read receipt or typing event waits in memory before being flushed in a batch
+SOCIAL_CHAT_FLUSH_SECONDS = float(os.environ.get('SOCIAL_CHAT_FLUSH_SECONDS', '1.0'))
+
+# Ranked feed: how fast scores decay with age, and how old a post can be and still rank
+SOCIAL_FEED_GRAVITY = float(os.environ.get('SOCIAL_FEED_GRAVITY', '1.8'))
+SOCIAL_FEED_RANK_WINDOW_DAYS = int(os.environ.get('SOCIAL_FEED_RANK_WINDOW_DAYS', '7'))
+
+# Chat messages older than this many days move to compressed segments (manage.py archive_messages)
+SOCIAL_CHAT_ARCHIVE_DAYS = int(os.environ.get('SOCIAL_CHAT_ARCHIVE_DAYS', '180'))
+
+# Uploaded avatars: content-addressed originals and on-demand thumbnails (see social/avatars.py)
+SOCIAL_AVATAR_ROOT = os.environ.get('SOCIAL_AVATAR_ROOT', str(BASE_DIR / 'media' / 'avatars'))
+SOCIAL_AVATAR_MAX_BYTES = int(os.environ.get('SOCIAL_AVATAR_MAX_BYTES', str(5 * 1024 * 1024)))
+SOCIAL_AVATAR_MAX_PIXELS = int(os.environ.get('SOCIAL_AVATAR_MAX_PIXELS', str(40_000_000)))
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class SocialConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'social'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import checks  # noqa: F401
+        from .db import configure_sqlite
+        from .profiling import install
+
+        connection_created.connect(configure_sqlite, dispatch_uid='social.configure_sqlite')
+        connection_created.connect(install, dispatch_uid='social.profiling')
@@ -0,0 +1,266 @@
+"""Cold storage for old chat messages.
+
+Messages older than ``SOCIAL_CHAT_ARCHIVE_DAYS`` are moved out of the
+``Message`` table into ``MessageSegment`` rows. Each row is a zlib-compressed
+run of up to ``SEGMENT_SIZE`` messages from one conversation, in
+``(created_at, id)`` order. The segments of a conversation never overlap and
+are indexed by their first key, so one short range scan over a handful of
+index entries finds the segment covering any position in the thread.
+
+Archiving is append-only per conversation. New messages are always written
+after the newest segment, and that segment is topped up until it is full, so
+a conversation ends up with full segments and at most one partial one
+however many runs it took. Each segment is written in the same transaction
+that deletes its messages. An interrupted run loses nothing, and the next run
+carries on from whatever is still in the hot table.
+
+Two kinds of messages stay hot even when they are old. One is a
+conversation's newest message, which inbox rows point at. The other is a
+straggler that sorts before the newest segment, which only happens when
+messages are backdated. Readers merge hot and archived messages, so either
+way threads page correctly.
+
+Archived messages drop out of search.
+
+Deleting a user cascades their hot messages, and :func:`purge_sender` does
+the same for the archived ones in their group chats (direct chats go with
+the user). That can leave partial segments before the newest one, which
+readers handle like any other. Messages from senders who left a group
+before being deleted are skipped when a page is read.
+"""
+
+import json
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import pagination
+from .models import Conversation, ConversationMember, Message, MessageSegment, SearchDocument
+
+SEGMENT_SIZE = 200
+_FIELDS = ('id', 'sender_id', 'created_at', 'body')
+
+
+def sort_key(message):
+    return message.created_at, message.pk
+
+
+def encode(messages):
+    rows = [
+        [message.pk, message.sender_id, message.created_at.isoformat(), message.body]
+        for message in messages
+    ]
+    return zlib.compress(json.dumps(rows, separators=(',', ':')).encode())
+
+
+def decode(segment):
+    """Return the messages stored in ``segment`` as ``Message`` instances, oldest first."""
+
+    rows = json.loads(zlib.decompress(segment.data))
+    return [
+        Message.from_db(
+            Message.objects.db,
+            ['id', 'conversation_id', 'sender_id', 'body', 'created_at'],
+            [pk, segment.conversation_id, sender_id, body, parse_datetime(created_at)],
+        )
+        for pk, sender_id, created_at, body in rows
+    ]
+
+
+def _attach_senders(messages):
+    """Fill in ``message.sender`` with one query, as ``select_related`` would.
+
+    Messages whose sender has since been deleted are dropped, as their hot
+    messages were.
+    """
+
+    senders = get_user_model().objects.in_bulk({message.sender_id for message in messages})
+    kept = []
+    for message in messages:
+        if message.sender_id in senders:
+            message.sender = senders[message.sender_id]
+            kept.append(message)
+    return kept
+
+
+def _in_batches(segments, size=2):
+    """Yield ``segments`` a couple of rows at a time; a page rarely needs more than two."""
+
+    offset = 0
+    while batch := list(segments[offset : offset + size]):
+        yield from batch
+        offset += size
+
+
+def messages_before(conversation, cursor, limit):
+    """Return up to ``limit`` archived messages sorting before ``cursor``, newest first."""
+
+    segments = pagination.before(
+        MessageSegment.objects.filter(conversation=conversation),
+        cursor,
+        time_field='first_created_at',
+        id_field='first_message_id',
+    ).order_by('-first_created_at', '-first_message_id')
+    found = []
+    for segment in _in_batches(segments):
+        messages = decode(segment)
+        if cursor is not None:
+            messages = [message for message in messages if sort_key(message) < cursor]
+        found.extend(reversed(messages))
+        if len(found) >= limit:
+            break
+    return _attach_senders(found[:limit])
+
+
+def messages_after(conversation, cursor, limit):
+    """Return up to ``limit`` archived messages sorting after ``cursor``, oldest first."""
+
+    segments = pagination.after(
+        MessageSegment.objects.filter(conversation=conversation),
+        cursor,
+        time_field='last_created_at',
+        id_field='last_message_id',
+    ).order_by('first_created_at', 'first_message_id')
+    found = []
+    for segment in _in_batches(segments):
+        found.extend(message for message in decode(segment) if sort_key(message) > cursor)
+        if len(found) >= limit:
+            break
+    return _attach_senders(found[:limit])
+
+
+def export_rows(conversation_ids):
+    """Yield archived messages of ``conversation_ids`` as export rows, one segment at a time."""
+
+    usernames = {}
+    segments = MessageSegment.objects.filter(conversation_id__in=conversation_ids).order_by(
+        'conversation_id', 'first_created_at', 'first_message_id'
+    )
+    for segment in segments.iterator(chunk_size=10):
+        messages = decode(segment)
+        missing = {message.sender_id for message in messages} - usernames.keys()
+        if missing:
+            usernames.update(
+                get_user_model().objects.filter(pk__in=missing).values_list('pk', 'username')
+            )
+        for message in messages:
+            yield {
+                'id': message.pk,
+                'conversation_id': message.conversation_id,
+                'sender__username': usernames.get(message.sender_id),
+                'body': message.body,
+                'created_at': message.created_at,
+            }
+
+
+def purge_sender(user_id):
+    """Remove ``user_id``'s messages from the segments of their group chats; return how many."""
+
+    removed = 0
+    segments = MessageSegment.objects.filter(
+        conversation__kind=Conversation.GROUP, conversation__members__user_id=user_id
+    )
+    for segment in segments.iterator(chunk_size=10):
+        messages = decode(segment)
+        kept = [message for message in messages if message.sender_id != user_id]
+        if len(kept) == len(messages):
+            continue
+        removed += len(messages) - len(kept)
+        if not kept:
+            segment.delete()
+            continue
+        segment.first_created_at, segment.first_message_id = sort_key(kept[0])
+        segment.last_created_at, segment.last_message_id = sort_key(kept[-1])
+        segment.message_count = len(kept)
+        segment.data = encode(kept)
+        segment.updated_at = timezone.now()
+        segment.save()
+    return removed
+
+
+def _write_segment(conversation_id, tail, held, fresh):
+    """Store ``held + fresh`` as ``tail`` (or a new segment) and delete ``fresh`` from the hot table."""
+
+    messages = held + fresh
+    segment = tail or MessageSegment(conversation_id=conversation_id)
+    segment.first_created_at, segment.first_message_id = sort_key(messages[0])
+    segment.last_created_at, segment.last_message_id = sort_key(messages[-1])
+    segment.message_count = len(messages)
+    segment.data = encode(messages)
+    segment.updated_at = timezone.now()
+    ids = [message.pk for message in fresh]
+    with transaction.atomic():
+        segment.save()
+        SearchDocument.objects.filter(kind=SearchDocument.MESSAGE, object_id__in=ids).delete()
+        # A raw delete skips Message's per-row signals: search documents went in
+        # one query above, and inbox rows never point at archived messages
+        Message.objects.filter(pk__in=ids)._raw_delete(Message.objects.db)
+        Conversation.objects.filter(pk=conversation_id).update(archived_until=segment.last_created_at)
+    return segment
+
+
+def archive_conversation(conversation_id, cutoff, max_segments=None):
+    """Move the conversation's messages older than ``cutoff`` into segments.
+
+    Returns ``(messages archived, segments written)``.
+    """
+
+    tail = (
+        MessageSegment.objects.filter(conversation_id=conversation_id)
+        .order_by('-first_created_at', '-first_message_id')
+        .first()
+    )
+    held = decode(tail) if tail and tail.message_count < SEGMENT_SIZE else []
+    newest = ConversationMember.objects.filter(conversation_id=conversation_id).values_list(
+        'last_message_id', flat=True
+    )
+    candidates = Message.objects.filter(conversation_id=conversation_id, created_at__lt=cutoff).exclude(
+        pk__in=[pk for pk in newest if pk is not None]
+    )
+    archived = written = 0
+    while max_segments is None or written < max_segments:
+        after = (tail.last_created_at, tail.last_message_id) if tail else None
+        fresh = list(
+            pagination.after(candidates, after)
+            .only(*_FIELDS)
+            .order_by('created_at', 'id')[: SEGMENT_SIZE - len(held)]
+        )
+        if not fresh:
+            break
+        tail = _write_segment(conversation_id, tail if held else None, held, fresh)
+        archived += len(fresh)
+        written += 1
+        held = held + fresh if tail.message_count < SEGMENT_SIZE else []
+    return archived, written
+
+
+def archive(older_than_days=None, max_segments=None, now=None):
+    """Archive every conversation's old messages; return ``(messages, segments)``.
+
+    ``max_segments`` bounds the work of one run; later runs pick up the rest.
+    """
+
+    now = now or timezone.now()
+    if older_than_days is None:
+        older_than_days = settings.SOCIAL_CHAT_ARCHIVE_DAYS
+    cutoff = now - timedelta(days=older_than_days)
+    conversation_ids = (
+        Message.objects.filter(created_at__lt=cutoff)
+        .order_by('conversation_id')
+        .values_list('conversation_id', flat=True)
+        .distinct()
+    )
+    archived = written = 0
+    for conversation_id in list(conversation_ids):
+        budget = None if max_segments is None else max_segments - written
+        if budget == 0:
+            break
+        messages, segments = archive_conversation(conversation_id, cutoff, budget)
+        archived += messages
+        written += segments
+    return archived, written
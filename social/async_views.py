@@ -0,0 +1,141 @@
+"""Async versions of the read-heavy pages, for serving under ASGI.
+
+They keep the behaviour, templates and query budgets of their counterparts
+in :mod:`social.views` but never block the event loop: queries go through
+Django's async ORM or ``sync_to_async``. Lookups that don't depend on each
+other are awaited with ``asyncio.gather``, but Django runs every ORM call on
+one thread-sensitive executor (connections can't be shared between threads),
+so their queries still run one after another. What ASGI buys is that the
+worker serves other connections while a page waits on the database. Writes
+(sending a message) still run the synchronous code in a worker thread so
+their transactions behave exactly as before.
+
+``urls.py`` serves these views when ``SOCIAL_ASYNC_VIEWS`` is on. Under
+WSGI each async view needs its own event loop, so leave it off there.
+"""
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.template.response import TemplateResponse
+
+from . import notifications, receipts, suggestions, views
+from .cache import store
+from .conditional import aconditional, feed_etag, thread_etag
+from .feed import aget_feed_page, prepare_page
+from .forms import CommentForm, GroupForm, MessageForm, PostForm
+from .friends import get_friend_ids
+from .models import FriendRequest, Notification
+from .threads import alatest_messages
+
+
+class AsyncLoginRequiredMixin:
+    """Load the session user in a worker thread before the sync login check reads it."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        await sync_to_async(lambda: request.user.is_authenticated)()
+        response = super().dispatch(request, *args, **kwargs)
+        if asyncio.iscoroutine(response):
+            response = await response
+        return response
+
+
+async def _pending_friend_requests(user):
+    pending = FriendRequest.objects.filter(receiver=user, status=FriendRequest.PENDING)
+    return [request async for request in pending.select_related('sender__profile')]
+
+
+async def _users(ids):
+    return [user async for user in get_user_model().objects.filter(id__in=ids).select_related('profile')]
+
+
+class FeedView(AsyncLoginRequiredMixin, views.FeedView):
+    @aconditional(feed_etag)
+    async def get(self, request, *args, **kwargs):
+        user = request.user
+        (posts, next_cursor), friend_requests, profile, people = await asyncio.gather(
+            aget_feed_page(user, ranked=self.ranked),
+            _pending_friend_requests(user),
+            sync_to_async(store.get_profile)(user.pk),
+            suggestions.asuggestions_for(user),
+        )
+        posts = await sync_to_async(prepare_page)(posts, user)
+        return TemplateResponse(
+            request,
+            self.template_name,
+            {
+                'posts': posts,
+                'next_cursor': next_cursor,
+                'ranked': self.ranked,
+                'profile': profile,
+                'post_form': PostForm(),
+                'comment_form': CommentForm(),
+                'friend_requests': friend_requests,
+                'suggestions': people,
+            },
+        )
+
+
+class ChatListView(AsyncLoginRequiredMixin, views.ChatListView):
+    async def get(self, request, *args, **kwargs):
+        paginator = Paginator(self.get_queryset(), self.paginate_by)
+
+        def load_page():
+            page = paginator.get_page(request.GET.get('page'))
+            page.object_list = list(page.object_list)
+            return page
+
+        page, friend_ids = await asyncio.gather(
+            sync_to_async(load_page)(),
+            sync_to_async(get_friend_ids)(request.user),
+        )
+        return TemplateResponse(
+            request,
+            self.template_name,
+            {
+                'threads': page.object_list,
+                'page_obj': page,
+                'paginator': paginator,
+                'is_paginated': page.has_other_pages(),
+                'friends': await _users(friend_ids),
+                'group_form': GroupForm(),
+            },
+        )
+
+
+class ChatThreadView(AsyncLoginRequiredMixin, views.ChatThreadView):
+    @aconditional(thread_etag)
+    async def get(self, request, username=None, pk=None):
+        conversation, other_user, redirect_response = await sync_to_async(self.get_conversation)(
+            request, username, pk
+        )
+        if redirect_response:
+            return redirect_response
+
+        _, (thread_messages, older_cursor), members = await asyncio.gather(
+            sync_to_async(notifications.mark_read)(request.user, Notification.MESSAGE, conversation.pk),
+            alatest_messages(conversation),
+            sync_to_async(self.group_members)(conversation),
+        )
+        if thread_messages:
+            await sync_to_async(receipts.mark_read)(
+                conversation.pk, request.user.pk, thread_messages[-1].pk
+            )
+        seen = await sync_to_async(receipts.seen_by_others)(
+            conversation.pk, request.user.pk, thread_messages
+        )
+        return self.thread_response(
+            request,
+            conversation,
+            other_user,
+            MessageForm(),
+            thread_messages,
+            older_cursor,
+            seen,
+            members,
+        )
+
+    async def post(self, request, username=None, pk=None):
+        return await sync_to_async(super().post)(request, username, pk)
@@ -0,0 +1,117 @@
+"""Uploaded avatars: content-addressed originals and thumbnails made on demand.
+
+An upload is stored once under the SHA-256 of its bytes, so two people
+uploading the same picture share one file, and re-uploading changes
+nothing. ``Profile.avatar_hash`` records which file a profile shows.
+
+Size variants are not made at upload time. The first request for
+``/avatars/<size>/<hash>.webp`` crops and scales the original to a square
+WebP and writes it next to the URL's path under ``SOCIAL_AVATAR_ROOT``. Every
+later request is a plain file read. A web server can serve that directory
+directly and only fall back to Django for variants that do not exist yet.
+The content of a URL never changes, so responses are cached for a year and
+marked ``immutable``.
+
+Files are written to a temporary name and renamed into place, so concurrent
+first requests for one variant cannot expose a half-written file.
+"""
+
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.urls import reverse
+from PIL import Image, ImageOps
+
+# Edge in pixels of each square variant: twice the largest size it is shown at
+SIZES = {
+    'sm': 96,
+    'md': 240,
+}
+CONTENT_TYPE = 'image/webp'
+QUALITY = 82
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def _root():
+    return Path(settings.SOCIAL_AVATAR_ROOT)
+
+
+def original_path(digest):
+    return _root() / 'original' / digest
+
+
+def variant_path(digest, size):
+    return _root() / size / f'{digest}.webp'
+
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as temporary:
+        temporary.write(data)
+    # Temporary files are private to their owner; a web server serving this
+    # directory needs the mode Django gives uploads
+    os.chmod(temporary.name, settings.FILE_UPLOAD_PERMISSIONS or 0o644)
+    os.replace(temporary.name, path)
+
+
+def save_upload(upload):
+    """Store an uploaded image under the hash of its bytes and return the hash."""
+
+    sha = hashlib.sha256()
+    for chunk in upload.chunks():
+        sha.update(chunk)
+    digest = sha.hexdigest()
+    path = original_path(digest)
+    if not path.exists():
+        upload.seek(0)
+        _write(path, upload.read())
+    return digest
+
+
+def render_variant(digest, size):
+    """Crop and scale the original to a square ``size`` variant and return its bytes."""
+
+    edge = SIZES[size]
+    with Image.open(original_path(digest)) as image:
+        # Lets JPEG decode at a reduced scale that still covers the variant
+        image.draft('RGB', (edge, edge))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+        thumbnail = ImageOps.fit(image, (edge, edge), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    thumbnail.save(buffer, 'WEBP', quality=QUALITY)
+    return buffer.getvalue()
+
+
+def variant(digest, size):
+    """Return the path of a size variant, making it on first request.
+
+    Raises ``FileNotFoundError`` for an unknown hash.
+    """
+
+    path = variant_path(digest, size)
+    if not path.exists():
+        _write(path, render_variant(digest, size))
+    return path
+
+
+def url(digest, size='sm'):
+    return reverse('avatar', args=[size, digest])
+
+
+class Stored:
+    """A profile's current avatar, shaped like the file ``ClearableFileInput`` links to."""
+
+    def __init__(self, digest):
+        self.digest = digest
+
+    def __str__(self):
+        return f'{self.digest[:12]}.webp'
+
+    @property
+    def url(self):
+        return url(self.digest, 'md')
@@ -0,0 +1,11 @@
+"""Application cache for hot, derived data.
+
+:mod:`~social.cache.core` provides the read-through :class:`Cache` with
+stampede protection, :mod:`~social.cache.backends` the storage it sits on,
+and :mod:`~social.cache.store` the typed accessors the views use.
+"""
+
+from .backends import LocalLRUBackend, SharedBackend
+from .core import Cache, Entry, Metrics, get_cache
+
+__all__ = ['Cache', 'Entry', 'LocalLRUBackend', 'Metrics', 'SharedBackend', 'get_cache']
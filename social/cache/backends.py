@@ -0,0 +1,101 @@
+"""Storage backends for :mod:`social.cache`.
+
+Backends store opaque entries with a time-to-live and know nothing about
+early expiration or coalescing; that logic lives in :class:`~social.cache.core.Cache`.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+
+class BaseBackend:
+    def get(self, key):
+        raise NotImplementedError
+
+    def get_many(self, keys):
+        return {key: entry for key in keys if (entry := self.get(key)) is not None}
+
+    def set(self, key, entry, ttl):
+        raise NotImplementedError
+
+    def delete_many(self, keys):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LocalLRUBackend(BaseBackend):
+    """Bounded in-process cache that evicts the least recently used entry.
+
+    Entries are private to the process, so invalidations made by other
+    workers are not seen until the TTL runs out. Use it for single-process
+    deployments, tests, or data where short staleness is acceptable.
+    """
+
+    def __init__(self, max_entries=10_000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            entry, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, ttl):
+        with self._lock:
+            self._entries[key] = (entry, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SharedBackend(BaseBackend):
+    """Store entries in one of Django's configured ``CACHES`` (Redis, memcached, ...)."""
+
+    def __init__(self, alias='default', key_prefix='social:'):
+        self.alias = alias
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key):
+        return self.cache.get(self.key_prefix + key)
+
+    def get_many(self, keys):
+        found = self.cache.get_many([self.key_prefix + key for key in keys])
+        return {key[len(self.key_prefix):]: entry for key, entry in found.items()}
+
+    def set(self, key, entry, ttl):
+        self.cache.set(self.key_prefix + key, entry, ttl)
+
+    def delete_many(self, keys):
+        self.cache.delete_many([self.key_prefix + key for key in keys])
+
+    def clear(self):
+        self.cache.clear()
@@ -0,0 +1,194 @@
+"""Read-through cache with request coalescing and probabilistic early expiry.
+
+Every value is stored with the time it took to compute. Readers use the
+XFetch rule (Vattani et al., "Optimal Probabilistic Cache Stampede
+Prevention") to refresh a popular key slightly *before* it expires: the
+closer the deadline and the slower the loader, the likelier a read is to
+volunteer. Only one thread per process runs the loader for a key at a time;
+concurrent readers either get the still-valid value or wait for the leader.
+"""
+
+import math
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, NamedTuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_TTL = 300
+DEFAULT_BETA = 1.0
+WAIT_TIMEOUT = 5.0
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class Entry(NamedTuple):
+    value: Any
+    delta: float  # seconds the loader took to compute value
+    expires_at: float  # wall-clock time, comparable across processes
+
+
+class Metrics:
+    """Thread-safe hit/miss counters grouped by key namespace (``friends``, ``profile``...)."""
+
+    EVENTS = ('hits', 'misses', 'early_refreshes', 'stale_hits', 'coalesced', 'load_errors')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(Counter)
+
+    def incr(self, key, event, amount=1):
+        namespace = key.split(':', 1)[0]
+        with self._lock:
+            self._counts[namespace][event] += amount
+
+    def snapshot(self):
+        with self._lock:
+            counts = {name: dict(counter) for name, counter in self._counts.items()}
+        for entry in counts.values():
+            for event in self.EVENTS:
+                entry.setdefault(event, 0)
+            lookups = entry['hits'] + entry['stale_hits'] + entry['misses']
+            entry['hit_rate'] = round((lookups - entry['misses']) / lookups, 3) if lookups else None
+        return counts
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+class _Flight:
+    """A load in progress that other readers of the same key can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.invalidated = False
+
+
+class Cache:
+    """Read-through/write-through cache over a pluggable backend."""
+
+    def __init__(self, backend, beta=DEFAULT_BETA, wait_timeout=WAIT_TIMEOUT):
+        self.backend = backend
+        self.beta = beta
+        self.wait_timeout = wait_timeout
+        self.metrics = Metrics()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _should_refresh(self, entry):
+        # XFetch: -log(U) is exponentially distributed, so early refreshes
+        # cluster just before expiry and scale with the cost of the loader
+        gap = entry.delta * self.beta * -math.log(1.0 - random.random())
+        return time.time() + gap >= entry.expires_at
+
+    def _store(self, key, value, delta, ttl):
+        self.backend.set(key, Entry(value, delta, time.time() + ttl), ttl)
+
+    def get_or_load(self, key, loader, ttl=DEFAULT_TTL):
+        """Return the cached value for ``key``, calling ``loader()`` on a miss."""
+
+        entry = self.backend.get(key)
+        if entry is not None and not self._should_refresh(entry):
+            self.metrics.incr(key, 'hits')
+            return entry.value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            if entry is not None:
+                # Someone is already refreshing; the current value is still valid
+                self.metrics.incr(key, 'stale_hits')
+                return entry.value
+            self.metrics.incr(key, 'coalesced')
+            if flight.done.wait(self.wait_timeout) and flight.error is None:
+                return flight.value
+            # The leader failed or stalled; load without caching the result
+            return loader()
+
+        self.metrics.incr(key, 'misses' if entry is None else 'early_refreshes')
+        try:
+            start = time.perf_counter()
+            value = loader()
+            if not flight.invalidated:
+                self._store(key, value, time.perf_counter() - start, ttl)
+            flight.value = value
+            return value
+        except BaseException as exc:
+            self.metrics.incr(key, 'load_errors')
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def get_many_or_load(self, keys, loader, ttl=DEFAULT_TTL):
+        """Batch version of :meth:`get_or_load`.
+
+        ``loader`` receives the list of missing keys and returns a dict of
+        the values it found; keys it leaves out are not cached. Batches are
+        not coalesced, so use this for cheap loaders keyed by row ID.
+        """
+
+        keys = list(keys)
+        found = self.backend.get_many(keys)
+        values = {}
+        missing = []
+        for key in keys:
+            entry = found.get(key)
+            if entry is None:
+                self.metrics.incr(key, 'misses')
+                missing.append(key)
+            else:
+                self.metrics.incr(key, 'hits')
+                values[key] = entry.value
+        if missing:
+            start = time.perf_counter()
+            loaded = loader(missing)
+            delta = (time.perf_counter() - start) / len(missing)
+            for key, value in loaded.items():
+                self._store(key, value, delta, ttl)
+            values.update(loaded)
+        return values
+
+    def set(self, key, value, ttl=DEFAULT_TTL):
+        """Write ``value`` through to the backend after the source of truth changed."""
+
+        self._store(key, value, 0.0, ttl)
+
+    def delete(self, *keys):
+        """Invalidate ``keys``, including results of loads still in flight."""
+
+        with self._lock:
+            for key in keys:
+                flight = self._flights.get(key)
+                if flight is not None:
+                    flight.invalidated = True
+        self.backend.delete_many(keys)
+
+    def clear(self):
+        self.backend.clear()
+        self.metrics.reset()
+
+
+def get_cache():
+    """Return the process-wide cache configured by ``SOCIAL_CACHE_BACKEND``."""
+
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                backend = import_string(settings.SOCIAL_CACHE_BACKEND)()
+                _cache = Cache(backend, beta=getattr(settings, 'SOCIAL_CACHE_BETA', DEFAULT_BETA))
+    return _cache
@@ -0,0 +1,201 @@
+"""Typed cache accessors for the data every page reads.
+
+Each accessor reads through :func:`~social.cache.core.get_cache` and each
+writer keeps the cached copy in step: profiles and post counters are written
+through with the fresh row, friend sets and inbox summaries are invalidated
+and reloaded by the next reader.
+
+Version stamps are opaque tokens that change whenever something they cover
+is written; conditional GETs hash them into ETags (see
+:mod:`social.conditional`). Bumping a stamp deletes it, and a missing stamp
+is replaced by a fresh token, so an evicted stamp can only cause a spurious
+cache miss, never a stale hit.
+
+Invalidation happens twice: straight away, so the writing request reads its
+own change, and again on commit, in case another request cached the old row
+while the transaction was open. Write-through values are only stored after
+commit so a rollback can never leave them behind. Loaders always read the
+primary database so a lagging replica can't be cached for a whole TTL.
+"""
+
+import uuid
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from ..db import primary
+from .core import get_cache
+
+# Friend sets gate friends-only posts, profiles and chats. With a per-process
+# cache, other workers only hear of an unfriending when their copy expires
+FRIENDS_TTL = 60
+PROFILE_TTL = 60 * 60
+COUNTERS_TTL = 5 * 60
+INBOX_TTL = 5 * 60
+VERSION_TTL = 24 * 60 * 60
+
+COUNTER_FIELDS = ('like_count', 'comment_count', 'version')
+
+
+def friends_key(user_id):
+    return f'friends:{user_id}'
+
+
+def profile_key(user_id):
+    return f'profile:{user_id}'
+
+
+def counters_key(post_id):
+    return f'post_counters:{post_id}'
+
+
+def inbox_key(user_id):
+    return f'inbox:{user_id}'
+
+
+def version_key(name):
+    return f'version:{name}'
+
+
+def user_version(user_id):
+    """Covers a user's profile, friends, friend requests and suggestions."""
+
+    return f'user:{user_id}'
+
+
+def posts_version(author_id):
+    """Covers an author's posts and their counters."""
+
+    return f'posts:{author_id}'
+
+
+SUGGESTIONS_VERSION = 'suggestions'
+
+
+def _invalidate(keys):
+    get_cache().delete(*keys)
+    transaction.on_commit(lambda: get_cache().delete(*keys))
+
+
+def _write_through(key, value, ttl):
+    get_cache().delete(key)
+    transaction.on_commit(lambda: get_cache().set(key, value, ttl))
+
+
+def _on_primary(loader):
+    def load(*args):
+        with primary():
+            return loader(*args)
+
+    return load
+
+
+def get_friend_ids(user_id):
+    """Return the frozenset of IDs ``user_id`` is friends with."""
+
+    from ..models import Friendship
+
+    return get_cache().get_or_load(
+        friends_key(user_id),
+        _on_primary(
+            lambda: frozenset(Friendship.objects.filter(user_id=user_id).values_list('friend_id', flat=True))
+        ),
+        FRIENDS_TTL,
+    )
+
+
+def invalidate_friend_ids(*user_ids):
+    _invalidate([friends_key(user_id) for user_id in user_ids])
+    bump_versions(*[user_version(user_id) for user_id in user_ids])
+
+
+def get_profile(user_id):
+    """Return the ``Profile`` for ``user_id``, or ``None`` if it does not exist."""
+
+    from ..models import Profile
+
+    return get_cache().get_or_load(
+        profile_key(user_id),
+        _on_primary(lambda: Profile.objects.filter(user_id=user_id).first()),
+        PROFILE_TTL,
+    )
+
+
+def store_profile(profile):
+    """Write a freshly saved profile through to the cache."""
+
+    _write_through(profile_key(profile.user_id), profile, PROFILE_TTL)
+    bump_versions(user_version(profile.user_id))
+
+
+def invalidate_profile(*user_ids):
+    """Drop cached profiles after a queryset ``update()`` that skipped ``save()``."""
+
+    _invalidate([profile_key(user_id) for user_id in user_ids])
+    bump_versions(*[user_version(user_id) for user_id in user_ids])
+
+
+def get_post_counters(post_ids):
+    """Return ``{post_id: {'like_count', 'comment_count', 'version'}}`` for ``post_ids``."""
+
+    from ..models import Post
+
+    def load(keys):
+        ids = [int(key.rsplit(':', 1)[1]) for key in keys]
+        rows = Post.objects.filter(pk__in=ids).values('pk', *COUNTER_FIELDS)
+        return {counters_key(row.pop('pk')): row for row in rows}
+
+    keys = [counters_key(pk) for pk in post_ids]
+    found = get_cache().get_many_or_load(keys, _on_primary(load), COUNTERS_TTL)
+    return {pk: found[counters_key(pk)] for pk in post_ids if counters_key(pk) in found}
+
+
+def refresh_post_counters(post):
+    """Reload ``post``'s counters after an ``F()`` update and write them through."""
+
+    post.refresh_from_db(fields=list(COUNTER_FIELDS))
+    counters = {field: getattr(post, field) for field in COUNTER_FIELDS}
+    _write_through(counters_key(post.pk), counters, COUNTERS_TTL)
+    bump_versions(posts_version(post.author_id))
+    return counters
+
+
+def invalidate_post_counters(*post_ids):
+    """Drop cached counters after a change made without :func:`refresh_post_counters`."""
+
+    _invalidate([counters_key(post_id) for post_id in post_ids])
+
+
+def get_inbox_summary(user_id):
+    """Return ``{'threads': n, 'messages': n}`` counting unread conversations and messages."""
+
+    from ..models import ConversationMember
+
+    def load():
+        summary = ConversationMember.objects.filter(user_id=user_id).aggregate(
+            threads=Count('pk', filter=Q(unread_count__gt=0)),
+            messages=Sum('unread_count'),
+        )
+        return {'threads': summary['threads'], 'messages': summary['messages'] or 0}
+
+    return get_cache().get_or_load(inbox_key(user_id), _on_primary(load), INBOX_TTL)
+
+
+def invalidate_inbox(*user_ids):
+    _invalidate([inbox_key(user_id) for user_id in user_ids])
+
+
+def get_versions(*names):
+    """Return the current token for each version stamp in ``names``."""
+
+    keys = [version_key(name) for name in names]
+    found = get_cache().get_many_or_load(
+        keys, lambda missing: {key: uuid.uuid4().hex for key in missing}, VERSION_TTL
+    )
+    return [found[key] for key in keys]
+
+
+def bump_versions(*names):
+    """Change the stamps in ``names`` after a write to what they cover."""
+
+    _invalidate([version_key(name) for name in names])
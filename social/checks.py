@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Warn when several workers would each keep their own copy of social.cache."""
+
+    per_process = (
+        settings.SOCIAL_CACHE_BACKEND == 'social.cache.LocalLRUBackend'
+        or settings.CACHES['default']['BACKEND'] in PER_PROCESS_CACHES
+    )
+    if not per_process:
+        return []
+    return [
+        Warning(
+            'social.cache is kept per process.',
+            hint=(
+                'Set REDIS_URL when running more than one worker. Otherwise a change handled by '
+                'one worker reaches the others only when their cached copy expires, and conditional '
+                'GETs are answered from per-process version stamps.'
+            ),
+            id='social.W001',
+        )
+    ]
@@ -0,0 +1,192 @@
+"""Conditional GET for the feed, profile and chat pages and their fragments.
+
+Each page gets a weak ETag hashed from small version stamps instead of from
+the rendered body, so a revalidation that matches is answered with a 304
+before the view runs its queries or renders anything:
+
+* the navbar state every page shows (unread badges, which are cached),
+* a ``store`` version stamp for the viewer's own data,
+* for the feed, the post ids, sort keys and versions read with the feed
+  index scans,
+* for a profile, the owner's profile row, a summary of their posts and the
+  friend requests between viewer and owner, all read from the database, and
+* for a chat, the members' last message and read positions, from one query.
+
+The cached parts are only shared between workers when ``social.cache`` is
+(see ``REDIS_URL`` and the ``social.W001`` deploy check). With a per-process
+cache, another worker's change to a cached badge can take until the entry
+expires to change this worker's ETags.
+
+Pages depend on several independent pieces of state with no single
+modification time, so only ETags are sent, not ``Last-Modified``. Responses
+are marked ``private, no-cache`` so browsers keep them but always revalidate.
+Requests with pending flash messages are never answered with a 304, so the
+messages are shown.
+
+The ETag is computed before the view runs. Views that write while they
+render, for example opening a thread marks it read, change their own
+stamps. So the first revalidation after such a visit is answered in full
+once more.
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.db.models import Count, Max, OuterRef, Q, Subquery, Sum
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from . import feed
+from .cache import store
+from .models import ConversationMember, FriendRequest, FriendSuggestion, Post, Profile
+from .receipts import TYPING_TOKEN_MAX_AGE
+
+# Profile fields the profile page shows
+PROFILE_FIELDS = ('bio', 'location', 'job_title', 'portfolio_url', 'avatar', 'avatar_hash')
+
+# Thread pages embed a signed typing token; rotate their ETag well before it expires
+TYPING_TOKEN_ROTATION = TYPING_TOKEN_MAX_AGE // 2
+
+
+def _etag(request, *parts):
+    user = request.user
+    if not user.is_authenticated or len(messages.get_messages(request)):
+        return None
+    profile = store.get_profile(user.pk)
+    # Pages embed CSRF tokens, so a new CSRF secret must not match an old page
+    get_token(request)
+    csrf_secret = request.META.get('CSRF_COOKIE', '')
+    state = (
+        request.get_full_path(),
+        bool(getattr(request, 'htmx', False)),
+        user.pk,
+        hashlib.sha256(csrf_secret.encode()).hexdigest()[:16],
+        profile.unread_notifications if profile else 0,
+        store.get_inbox_summary(user.pk),
+        *store.get_versions(store.user_version(user.pk)),
+        *parts,
+    )
+    return 'W/"%s"' % hashlib.md5(repr(state).encode(), usedforsecurity=False).hexdigest()
+
+
+def _respond(request, etag, response):
+    if etag and request.method in ('GET', 'HEAD') and response.status_code == 200:
+        response.headers.setdefault('ETag', etag)
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional(etag_func):
+    """Answer GETs with a 304 when ``etag_func`` matches ``If-None-Match``.
+
+    Like Django's ``condition`` decorator, but also marks the response
+    ``private, no-cache``. ``etag_func`` returns ``None`` to skip the check.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            etag = etag_func(request, *args, **kwargs)
+            if etag:
+                not_modified = get_conditional_response(request, etag=etag)
+                if not_modified is not None:
+                    return not_modified
+            return _respond(request, etag, view(request, *args, **kwargs))
+
+        return wrapper
+
+    return decorator
+
+
+def aconditional(etag_func):
+    """:func:`conditional` for the ``get`` method of an async class-based view.
+
+    Applied to the method itself (``method_decorator`` would hide that it is
+    a coroutine); ``etag_func`` runs in a worker thread.
+    """
+
+    def decorator(method):
+        @wraps(method)
+        async def wrapper(self, request, *args, **kwargs):
+            etag = await sync_to_async(etag_func)(request, *args, **kwargs)
+            if etag:
+                not_modified = get_conditional_response(request, etag=etag)
+                if not_modified is not None:
+                    return not_modified
+            return _respond(request, etag, await method(self, request, *args, **kwargs))
+
+        return wrapper
+
+    return decorator
+
+
+def feed_etag(request, *args, **kwargs):
+    """The feed page or a page after ``?cursor=``, in either mode."""
+
+    ranked = request.GET.get('mode') == 'ranked'
+    cursor = None
+    if 'cursor' in request.GET:
+        cursor = feed.decode_feed_cursor(request.GET['cursor'], ranked)
+        if cursor is None:
+            return None
+    # Versions come from the database with the keys; cached counters may lag an edit
+    keys = feed.page_keys(request.user, cursor, ranked=ranked)
+    return _etag(request, keys, *store.get_versions(store.SUGGESTIONS_VERSION))
+
+
+def profile_etag(request, username, *args, **kwargs):
+    """A profile page, from the owner's profile row, posts and requests between the pair.
+
+    Read from the database rather than from cached version stamps, which
+    would only see changes made through this process's cache.
+    """
+
+    posts = Post.objects.filter(author_id=OuterRef('user_id')).order_by().values('author_id')
+    profile = (
+        Profile.objects.filter(user__username=username)
+        .annotate(
+            post_count=Subquery(posts.annotate(value=Count('pk')).values('value')),
+            newest_post=Subquery(posts.annotate(value=Max('pk')).values('value')),
+            post_versions=Subquery(posts.annotate(value=Sum('version')).values('value')),
+        )
+        .values_list('user_id', *PROFILE_FIELDS, 'post_count', 'newest_post', 'post_versions')
+        .first()
+    )
+    if profile is None:
+        return None
+    owner_id, viewer_id = profile[0], request.user.pk
+    requests = list(
+        FriendRequest.objects.filter(
+            Q(sender_id=viewer_id, receiver_id=owner_id) | Q(sender_id=owner_id, receiver_id=viewer_id)
+        )
+        .order_by('pk')
+        .values_list('pk', 'status')
+    )
+    people = None
+    if owner_id == viewer_id:
+        people = FriendSuggestion.objects.filter(user_id=viewer_id).aggregate(
+            count=Count('pk'), computed=Max('computed_at')
+        )
+    return _etag(request, profile, requests, people)
+
+
+def thread_etag(request, username=None, pk=None, *args, **kwargs):
+    """A chat page or history fragment, addressed by username or conversation id."""
+
+    viewer_rows = ConversationMember.objects.filter(user=request.user)
+    if pk is not None:
+        viewer_rows = viewer_rows.filter(conversation_id=pk)
+    else:
+        viewer_rows = viewer_rows.filter(other_user__username=username)
+    members = list(
+        ConversationMember.objects.filter(conversation_id__in=viewer_rows.values('conversation_id'))
+        .order_by('pk')
+        .values_list('conversation_id', 'user_id', 'role', 'last_message_id', 'last_read_message_id')
+    )
+    if not any(user_id == request.user.pk for _, user_id, *_ in members):
+        # Not a member, or a chat that doesn't exist yet: let the view decide
+        return None
+    return _etag(request, members, int(time.time() // TYPING_TOKEN_ROTATION))
@@ -0,0 +1,22 @@
+from django.utils.functional import SimpleLazyObject
+
+from . import notifications
+from .cache import store
+
+
+def inbox(request):
+    """Expose the signed-in user's unread conversation counts to every template."""
+
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'inbox': SimpleLazyObject(lambda: store.get_inbox_summary(user.pk))}
+
+
+def notification_badge(request):
+    """Expose the signed-in user's unread notification count, read from the cached profile."""
+
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'unread_notifications': SimpleLazyObject(lambda: notifications.unread_count(user))}
@@ -0,0 +1,186 @@
+"""Stream a copy of everything a user has stored, without holding it in memory.
+
+Each section is read with a chunked ``iterator()`` over ``values()``, so
+neither model instances nor whole result sets are kept around, and the
+encoded rows are handed on in chunks of about ``CHUNK_BYTES``. Memory use
+therefore depends on the chunk sizes, not on how long the user's history is.
+
+Formats:
+
+* ``ndjson``: every section, one JSON object per line tagged with its
+  ``section``.
+* ``csv``: a single section with a header row.
+* ``zip``: one CSV file per section. It is written by :mod:`zipfile`
+  straight into the stream, using data descriptors instead of seeking back,
+  so no temporary file is needed.
+"""
+
+import csv
+import json
+import zipfile
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from . import archive
+from .models import Comment, ConversationMember, FriendRequest, Like, Message, Post
+
+FORMATS = ('ndjson', 'csv', 'zip')
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'zip': 'application/zip',
+}
+ROWS_PER_QUERY = 2000
+CHUNK_BYTES = 64 * 1024
+
+
+def _conversations(user):
+    return ConversationMember.objects.filter(user=user).values('conversation_id')
+
+
+def _messages(user):
+    return Message.objects.filter(conversation_id__in=_conversations(user))
+
+
+# Section name: (rows belonging to the user, exported columns)
+SECTIONS = {
+    'posts': (
+        lambda user: Post.objects.filter(author=user),
+        ('id', 'message', 'visibility', 'created_at', 'like_count', 'comment_count'),
+    ),
+    'comments': (
+        lambda user: Comment.objects.filter(author=user),
+        ('id', 'post_id', 'text', 'created_at'),
+    ),
+    'likes': (
+        lambda user: Like.objects.filter(user=user),
+        ('id', 'post_id', 'created_at'),
+    ),
+    'friend_requests': (
+        lambda user: FriendRequest.objects.filter(Q(sender=user) | Q(receiver=user)),
+        ('id', 'sender__username', 'receiver__username', 'status', 'created_at', 'responded_at'),
+    ),
+    'messages': (
+        _messages,
+        ('id', 'conversation_id', 'sender__username', 'body', 'created_at'),
+    ),
+}
+
+
+def rows(user, section):
+    """Yield ``section``'s rows for ``user`` as dicts, oldest first.
+
+    Archived messages come before the ones still in the ``Message`` table.
+    """
+
+    queryset, fields = SECTIONS[section]
+    if section == 'messages':
+        yield from archive.export_rows(_conversations(user))
+    yield from queryset(user).order_by('pk').values(*fields).iterator(chunk_size=ROWS_PER_QUERY)
+
+
+def _chunked(pieces):
+    """Join small encoded pieces into chunks of about ``CHUNK_BYTES``."""
+
+    size = CHUNK_BYTES
+    buffer, buffered = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= size:
+            yield b''.join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _ndjson_lines(user, sections):
+    for section in sections:
+        for row in rows(user, section):
+            yield (json.dumps({'section': section, **row}, cls=DjangoJSONEncoder) + '\n').encode()
+
+
+class _Echo:
+    """A file-like ``csv.writer`` target that hands back each formatted row."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(user, section):
+    writer = csv.writer(_Echo())
+    header = SECTIONS[section][1]
+    yield writer.writerow(header).encode()
+    for row in rows(user, section):
+        yield writer.writerow([row[column] for column in header]).encode()
+
+
+class _Sink:
+    """A write-only, non-seekable buffer that :class:`zipfile.ZipFile` streams into."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _zip_chunks(user, sections):
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+        for section in sections:
+            with bundle.open(f'{section}.csv', 'w', force_zip64=True) as member:
+                for chunk in _chunked(_csv_lines(user, section)):
+                    member.write(chunk)
+                    if data := sink.drain():
+                        yield data
+    yield sink.drain()
+
+
+def stream(user, format='ndjson', section=None):
+    """Yield the export as chunks of bytes.
+
+    ``section`` limits the export to one section and is required for CSV.
+    """
+
+    if format not in FORMATS:
+        raise ValueError(f'Unknown export format {format!r}.')
+    if section is not None and section not in SECTIONS:
+        raise ValueError(f'Unknown export section {section!r}.')
+    if format == 'csv' and section is None:
+        raise ValueError('CSV exports need a section; use zip for all of them.')
+    sections = [section] if section else list(SECTIONS)
+    if format == 'zip':
+        return _zip_chunks(user, sections)
+    if format == 'csv':
+        return _chunked(_csv_lines(user, section))
+    return _chunked(_ndjson_lines(user, sections))
+
+
+def filename(user, format, section=None):
+    return f"{user.username}-{section or 'export'}.{format}"
+
+
+async def aiter_chunks(chunks):
+    """Serve a sync chunk iterator to an ASGI server one chunk at a time.
+
+    Django 4.2 would otherwise read a sync iterator into a list before
+    streaming it asynchronously. Every ``next()`` runs on the same worker
+    thread, so the database cursor behind the iterator stays usable.
+    """
+
+    done = object()
+    get_next = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await get_next(chunks, done)) is not done:
+        yield chunk
@@ -0,0 +1,200 @@
+"""Read path for the news feed.
+
+Posts written by a user are pushed into their own and their friends'
+timelines when they are created (see ``TimelineEntry.fan_out``), so a page of
+the feed is the merge of two newest-first keyset scans that are both bounded
+by the page size:
+
+* the reader's materialized timeline (own and friends' posts), and
+* the public stream, which covers public posts from everyone else.
+
+Neither scan depends on how many posts exist in total.
+
+The ranked mode reads the same two sources in score order instead, using
+the ``(owner, -score)`` timeline index and the ``(visibility, -score)`` post
+index (scores are maintained by :mod:`social.ranking`). Its public scan
+skips the reader's own and friends' posts, which already come from the
+timeline with their affinity-weighted score.
+
+Post cards cache their viewer-independent fragments keyed on
+``Post.version``, so before rendering a page only the posts whose comment
+fragment is missing from the cache get their comments loaded.
+
+``aget_feed_page`` is the same read for async views. It awaits both scans
+with ``asyncio.gather``, though the async ORM still runs them one after the
+other on Django's thread-sensitive executor.
+"""
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db.models import prefetch_related_objects
+
+from . import pagination
+from .friends import get_friend_ids
+from .models import Like, Post, TimelineEntry
+
+FEED_PAGE_SIZE = 20
+
+
+def timeline_queryset(user, cursor=None):
+    """Newest-first entries of ``user``'s materialized timeline."""
+
+    entries = pagination.before(
+        TimelineEntry.objects.filter(owner=user), cursor, id_field='post_id'
+    )
+    return entries.select_related('post__author__profile').order_by('-created_at', '-post_id')
+
+
+def public_queryset(cursor=None):
+    """Newest-first public posts from everyone."""
+
+    public = pagination.before(Post.objects.filter(visibility='public'), cursor)
+    return public.select_related('author__profile').order_by('-created_at', '-id')
+
+
+def ranked_timeline_queryset(user, cursor=None):
+    """Highest-scoring entries of ``user``'s materialized timeline."""
+
+    entries = pagination.before(
+        TimelineEntry.objects.filter(owner=user), cursor, time_field='score', id_field='post_id'
+    )
+    return entries.select_related('post__author__profile').order_by('-score', '-post_id')
+
+
+def ranked_public_queryset(excluded_author_ids, cursor=None):
+    """Highest-scoring public posts by anyone not in ``excluded_author_ids``."""
+
+    public = Post.objects.filter(visibility='public').exclude(author_id__in=excluded_author_ids)
+    public = pagination.before(public, cursor, time_field='score')
+    return public.select_related('author__profile').order_by('-score', '-id')
+
+
+def _merge_page(entries, public, limit):
+    merged = {entry.post_id: entry.post for entry in entries}
+    for post in public:
+        merged.setdefault(post.id, post)
+    ordered = sorted(merged.values(), key=lambda post: (post.created_at, post.id), reverse=True)
+
+    posts = ordered[:limit]
+    next_cursor = None
+    if len(ordered) > limit:
+        last = posts[-1]
+        next_cursor = pagination.encode_cursor(last.created_at, last.id)
+    return posts, next_cursor
+
+
+def _merge_ranked_page(entries, public, limit):
+    ranked = []
+    for entry in entries:
+        entry.post.rank = entry.score
+        ranked.append(entry.post)
+    for post in public:
+        post.rank = post.score
+        ranked.append(post)
+    ranked.sort(key=lambda post: (post.rank, post.id), reverse=True)
+
+    posts = ranked[:limit]
+    next_cursor = None
+    if len(ranked) > limit:
+        last = posts[-1]
+        next_cursor = pagination.encode_score_cursor(last.rank, last.id)
+    return posts, next_cursor
+
+
+def _ranked_excluded(user):
+    return get_friend_ids(user) | {user.pk}
+
+
+def get_feed_page(user, cursor=None, limit=FEED_PAGE_SIZE, ranked=False):
+    """Return ``(posts, next_cursor)`` for one page of ``user``'s feed.
+
+    ``cursor`` comes from :func:`decode_feed_cursor` with the same ``ranked``.
+    """
+
+    if ranked:
+        entries = ranked_timeline_queryset(user, cursor)[: limit + 1]
+        public = ranked_public_queryset(_ranked_excluded(user), cursor)[: limit + 1]
+        return _merge_ranked_page(entries, public, limit)
+    entries = timeline_queryset(user, cursor)[: limit + 1]
+    public = public_queryset(cursor)[: limit + 1]
+    return _merge_page(entries, public, limit)
+
+
+def page_keys(user, cursor=None, limit=FEED_PAGE_SIZE, ranked=False):
+    """The ``(post_id, sort_key, version)`` rows both scans of :func:`get_feed_page` would read.
+
+    Read from the same indexes, plus each post's ``version`` by primary key,
+    without loading posts, so a conditional GET can tell whether the page
+    changed. The list changes whenever the page does, though not only then.
+    """
+
+    if ranked:
+        entries = ranked_timeline_queryset(user, cursor).values_list('post_id', 'score', 'post__version')
+        public = ranked_public_queryset(_ranked_excluded(user), cursor).values_list('id', 'score', 'version')
+    else:
+        entries = timeline_queryset(user, cursor).values_list('post_id', 'created_at', 'post__version')
+        public = public_queryset(cursor).values_list('id', 'created_at', 'version')
+    return [*entries[: limit + 1], *public[: limit + 1]]
+
+
+def decode_feed_cursor(token, ranked=False):
+    if ranked:
+        return pagination.decode_score_cursor(token)
+    return pagination.decode_cursor(token)
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def aget_feed_page(user, cursor=None, limit=FEED_PAGE_SIZE, ranked=False):
+    """Async version of :func:`get_feed_page`."""
+
+    if ranked:
+        excluded = await sync_to_async(_ranked_excluded)(user)
+        entries, public = await asyncio.gather(
+            _alist(ranked_timeline_queryset(user, cursor)[: limit + 1]),
+            _alist(ranked_public_queryset(excluded, cursor)[: limit + 1]),
+        )
+        return _merge_ranked_page(entries, public, limit)
+    entries, public = await asyncio.gather(
+        _alist(timeline_queryset(user, cursor)[: limit + 1]),
+        _alist(public_queryset(cursor)[: limit + 1]),
+    )
+    return _merge_page(entries, public, limit)
+
+
+def mark_liked(posts, user):
+    """Set ``is_liked`` on a page of posts with one query for the viewer's likes."""
+
+    liked = set(
+        Like.objects.filter(user=user, post__in=[post.pk for post in posts]).values_list(
+            'post_id', flat=True
+        )
+    )
+    for post in posts:
+        post.is_liked = post.pk in liked
+    return posts
+
+
+def prefetch_uncached_comments(posts):
+    """Load comments only for posts whose cached comment fragment is missing."""
+
+    keys = {
+        make_template_fragment_key('post_comments', [post.pk, post.version]): post
+        for post in posts
+    }
+    cached = cache.get_many(list(keys))
+    prefetch_related_objects(
+        [post for key, post in keys.items() if key not in cached], 'comments__author'
+    )
+    return posts
+
+
+def prepare_page(posts, user):
+    """Attach everything a page of post cards needs before it is rendered."""
+
+    return prefetch_uncached_comments(mark_liked(posts, user))
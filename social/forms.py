@@ -1,8 +1,11 @@
 from django import forms
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm
+from django.template.defaultfilters import filesizeformat
 
-from .models import Comment, Message, Post, Profile
+from . import avatars
+from .models import Comment, Conversation, Message, Post, Profile
 
 
 class SignUpForm(UserCreationForm):
@@ -38,6 +41,12 @@ class CommentForm(forms.ModelForm):
 
 
 class ProfileForm(forms.ModelForm):
+    avatar_upload = forms.ImageField(
+        required=False,
+        label='Upload avatar',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': 'image/*'}),
+    )
+
     class Meta:
         model = Profile
         fields = ('bio', 'location', 'job_title', 'portfolio_url', 'avatar')
@@ -49,6 +58,37 @@ class ProfileForm(forms.ModelForm):
             'avatar': forms.URLInput(attrs={'class': 'form-control'}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Gives the widget a current file, so it offers the "clear" checkbox
+        if self.instance.avatar_hash:
+            self.initial['avatar_upload'] = avatars.Stored(self.instance.avatar_hash)
+
+    def clean_avatar_upload(self):
+        upload = self.cleaned_data['avatar_upload']
+        if not upload:
+            return upload
+        if upload.size > settings.SOCIAL_AVATAR_MAX_BYTES:
+            raise forms.ValidationError(
+                f'Avatars can be at most {filesizeformat(settings.SOCIAL_AVATAR_MAX_BYTES)}.'
+            )
+        width, height = upload.image.size
+        if width * height > settings.SOCIAL_AVATAR_MAX_PIXELS:
+            raise forms.ValidationError('That image has too many pixels for an avatar.')
+        return upload
+
+    def save(self, commit=True):
+        profile = super().save(commit=False)
+        upload = self.cleaned_data.get('avatar_upload')
+        if upload:
+            profile.avatar_hash = avatars.save_upload(upload)
+        elif upload is False:
+            # The widget's "clear" checkbox; the stored file may be shared, so it stays
+            profile.avatar_hash = ''
+        if commit:
+            profile.save()
+        return profile
+
 
 class MessageForm(forms.ModelForm):
     class Meta:
@@ -59,3 +99,27 @@ class MessageForm(forms.ModelForm):
                 attrs={'rows': 3, 'class': 'form-control', 'placeholder': 'Say hello...'}
             )
         }
+
+
+class GroupForm(forms.ModelForm):
+    members = forms.ModelMultipleChoiceField(
+        queryset=get_user_model().objects.none(), widget=forms.CheckboxSelectMultiple
+    )
+
+    class Meta:
+        model = Conversation
+        fields = ('title',)
+        widgets = {'title': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Group name'})}
+
+    def __init__(self, *args, friend_ids=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['title'].required = True
+        self.fields['members'].queryset = get_user_model().objects.filter(id__in=friend_ids)
+
+    def clean_members(self):
+        members = self.cleaned_data['members']
+        if len(members) >= Conversation.MAX_GROUP_MEMBERS:
+            raise forms.ValidationError(
+                f'Groups can have at most {Conversation.MAX_GROUP_MEMBERS} members.'
+            )
+        return members
@@ -0,0 +1,36 @@
+"""Friend-set lookups backed by the ``Friendship`` edge table.
+
+A user's friend IDs are read from the edge table once, kept in
+:mod:`social.cache` until the friendship changes, and memoized on the user
+instance so a single request never builds the same set twice.
+"""
+
+from .cache import store
+
+_MEMO_ATTR = '_friend_ids'
+
+
+def get_friend_ids(user):
+    """Return a frozenset of user IDs the given user is friends with."""
+
+    memo = getattr(user, _MEMO_ATTR, None)
+    if memo is not None:
+        return memo
+    friend_ids = store.get_friend_ids(user.pk)
+    setattr(user, _MEMO_ATTR, friend_ids)
+    return friend_ids
+
+
+def is_friend(user, other_user):
+    """Check if two users have an accepted friendship connection."""
+
+    return other_user.pk in get_friend_ids(user)
+
+
+def invalidate_friend_ids(*users):
+    """Forget cached friend sets after a friendship is created or removed."""
+
+    store.invalidate_friend_ids(*[user.pk for user in users])
+    for user in users:
+        if hasattr(user, _MEMO_ATTR):
+            delattr(user, _MEMO_ATTR)
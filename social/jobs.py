@@ -0,0 +1,113 @@
+"""Side effects that run on the task queue instead of in the request.
+
+Every job here is a batch task: the worker hands it all the queued payloads
+of its kind at once, so each one applies a burst of events with a handful of
+bulk statements. Jobs must be idempotent because a task can run again after
+a worker dies mid-batch.
+"""
+
+from collections import defaultdict
+
+from . import notifications, ranking, search, suggestions
+from .models import (
+    Comment,
+    Friendship,
+    Message,
+    Post,
+    Profile,
+    SearchDocument,
+    TimelineEntry,
+)
+from .tasks import task
+
+
+@task(name='social.fan_out_posts', batch=True)
+def fan_out_posts(payloads):
+    """Push new posts into their authors' friends' timelines.
+
+    Friends are read when the job runs rather than when the post was
+    written, so friendships made or ended in between are respected.
+    """
+
+    posts = list(Post.objects.filter(pk__in=[payload['post_id'] for payload in payloads]))
+    friends = defaultdict(list)
+    edges = Friendship.objects.filter(user_id__in={post.author_id for post in posts})
+    for user_id, friend_id in edges.values_list('user_id', 'friend_id'):
+        friends[user_id].append(friend_id)
+    # One mutual-friend count per author, not per post
+    affinities = {
+        author_id: ranking.affinities(author_id, friend_ids) for author_id, friend_ids in friends.items()
+    }
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry.for_reader(owner_id, post, affinity)
+            for post in posts
+            for owner_id, affinity in affinities.get(post.author_id, {}).items()
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+@task(name='social.sync_timelines', batch=True)
+def sync_timelines(payloads):
+    """Backfill or prune timelines after friendships start or end, in queue order."""
+
+    for payload in payloads:
+        owner_id, author_id = payload['owner_id'], payload['author_id']
+        if payload['connected']:
+            TimelineEntry.backfill(owner_id, author_id)
+        else:
+            TimelineEntry.prune(owner_id, author_id)
+
+
+@task(name='social.rescore_posts', batch=True)
+def rescore_posts(payloads):
+    """Recompute ranked-feed scores once per post, however many likes and comments it got."""
+
+    ranking.rescore({payload['post_id'] for payload in payloads})
+
+
+@task(name='social.refresh_suggestions', batch=True)
+def refresh_suggestions(payloads):
+    """Recompute suggestions around every friendship change in the batch at once."""
+
+    user_ids = {user_id for payload in payloads for user_id in payload['user_ids']}
+    suggestions.refresh_around(*user_ids)
+
+
+_SEARCH_SOURCES = {
+    SearchDocument.POST: Post.objects.all(),
+    SearchDocument.COMMENT: Comment.objects.select_related('post'),
+    SearchDocument.MESSAGE: Message.objects.all(),
+    SearchDocument.PROFILE: Profile.objects.all(),
+}
+
+
+@task(name='social.index_search', batch=True)
+def index_search(payloads):
+    """Index saved rows, loading each kind with one query."""
+
+    ids_by_kind = defaultdict(set)
+    audience_changed = set()
+    for payload in payloads:
+        ids_by_kind[payload['kind']].add(payload['id'])
+        if payload.get('audience'):
+            audience_changed.add(payload['id'])
+    for kind, ids in ids_by_kind.items():
+        found = _SEARCH_SOURCES[kind].in_bulk(ids)
+        missing = ids - found.keys()
+        if missing:
+            # Deleted before the job ran
+            SearchDocument.objects.filter(kind=kind, object_id__in=missing).delete()
+        for instance in found.values():
+            search.index_object(instance)
+            if kind == SearchDocument.POST and instance.pk in audience_changed:
+                search.update_post_audience(instance)
+
+
+@task(name='social.deliver_notifications', batch=True)
+def deliver_notifications(payloads):
+    """Write queued notifications, coalescing events about the same target."""
+
+    notifications.deliver(payloads)
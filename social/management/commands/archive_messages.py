@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from social import archive
+
+
+class Command(BaseCommand):
+    """Move old chat messages into compressed per-conversation segments.
+
+    Every segment is committed together with the deletion of its messages,
+    so the command can be stopped at any point and simply run again. Use
+    ``--max-segments`` to spread a large backlog over several scheduled runs.
+    """
+
+    help = 'Archive chat messages older than SOCIAL_CHAT_ARCHIVE_DAYS into compressed segments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=settings.SOCIAL_CHAT_ARCHIVE_DAYS)
+        parser.add_argument(
+            '--max-segments', type=int, default=None, help='Stop after writing this many segments.'
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        messages, segments = archive.archive(
+            older_than_days=options['older_than_days'], max_segments=options['max_segments']
+        )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(f'Archived {messages} messages into {segments} segments in {elapsed:.2f}s.')
+        )
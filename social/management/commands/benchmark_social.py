@@ -0,0 +1,146 @@
+import json
+import math
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from social.models import ConversationMember, Post
+
+
+class _Rollback(Exception):
+    pass
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a list of numbers."""
+
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Command(BaseCommand):
+    """Drive the main views through the test client and report latency as JSON.
+
+    Write scenarios run inside a transaction that is rolled back after each
+    request, so repeated runs see the same data and stay comparable.
+    """
+
+    help = 'Benchmark the feed, profile, chat and interaction views (p50/p95/p99 and query counts).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username to benchmark as (defaults to the most connected user)')
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--baseline', help='Earlier JSON report to compare against')
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        client = Client()
+        client.force_login(user)
+
+        results = {}
+        for name, method, path, data in self.scenarios(user):
+            results[name] = self.run_scenario(client, method, path, data, options)
+
+        report = {
+            'user': user.username,
+            'iterations': options['iterations'],
+            'database': connection.vendor,
+            'scenarios': results,
+        }
+        if options['baseline']:
+            with open(options['baseline']) as handle:
+                report['comparison'] = self.compare(json.load(handle), results)
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        self.stdout.write(output)
+
+    def get_user(self, username):
+        User = get_user_model()
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist as exc:
+                raise CommandError(f'No user named {username!r}') from exc
+        member = ConversationMember.objects.select_related('user').order_by('-last_activity_at').first()
+        if member is None:
+            raise CommandError('No conversations found; run seed_social first or pass --user.')
+        return member.user
+
+    def scenarios(self, user):
+        member = ConversationMember.objects.filter(user=user).select_related('other_user').first()
+        post = Post.objects.filter(visibility='public').first()
+        if member is None or post is None:
+            raise CommandError(f'{user.username} needs a conversation and a public post to benchmark.')
+        friend = member.other_user
+        return [
+            ('feed', 'get', reverse('feed'), None),
+            ('profile', 'get', reverse('profile', args=[friend.username]), None),
+            ('chat_list', 'get', reverse('chat_list'), None),
+            ('chat_thread', 'get', reverse('chat_thread', args=[friend.username]), None),
+            ('toggle_like', 'post', reverse('toggle_like', args=[post.pk]), {}),
+            ('add_comment', 'post', reverse('add_comment', args=[post.pk]), {'text': 'Benchmark comment'}),
+        ]
+
+    def run_scenario(self, client, method, path, data, options):
+        timings, query_counts = [], []
+        for iteration in range(options['warmup'] + options['iterations']):
+            elapsed, queries = self.request(client, method, path, data)
+            if iteration >= options['warmup']:
+                timings.append(elapsed)
+                query_counts.append(queries)
+        return {
+            'path': path,
+            'method': method.upper(),
+            'p50_ms': round(percentile(timings, 0.50), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries_min': min(query_counts),
+            'queries_max': max(query_counts),
+        }
+
+    def request(self, client, method, path, data):
+        if method == 'get':
+            return self.timed(client, method, path, data)
+        result = None
+        try:
+            with transaction.atomic():
+                result = self.timed(client, method, path, data)
+                raise _Rollback
+        except _Rollback:
+            pass
+        return result
+
+    def timed(self, client, method, path, data):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = getattr(client, method)(path, data or {})
+            elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code >= 400:
+            raise CommandError(f'{method.upper()} {path} returned {response.status_code}')
+        return elapsed, len(queries)
+
+    def compare(self, baseline, results):
+        comparison = {}
+        for name, current in results.items():
+            before = baseline.get('scenarios', {}).get(name)
+            if not before:
+                continue
+            comparison[name] = {
+                key: round(current[key] / before[key], 3) if before[key] else None
+                for key in ('p50_ms', 'p95_ms', 'p99_ms')
+            }
+            comparison[name]['queries_delta'] = current['queries_max'] - before['queries_max']
+        return comparison
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from social import suggestions
+
+
+class Command(BaseCommand):
+    """Rebuild the whole ``FriendSuggestion`` table.
+
+    Accepting or removing a friend queues a refresh of the affected users;
+    run this nightly to catch up on anything that bypassed signals
+    (bulk loads, manual edits) or after changing ``--top-k``.
+    """
+
+    help = 'Precompute the top people-you-may-know candidates for every user.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=suggestions.SUGGESTIONS_PER_USER)
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        rows = suggestions.rebuild_all(k=options['top_k'], batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'Stored {rows} suggestions in {elapsed:.2f}s.'))
@@ -0,0 +1,46 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from social import export
+
+
+class Command(BaseCommand):
+    """Write one user's data export to a file or stdout.
+
+    Uses the same streaming writer as the ``/export/`` endpoint, so memory
+    stays flat however much history the user has.
+    """
+
+    help = "Export a user's posts, comments, likes, friend requests and messages."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--format', choices=export.FORMATS, default='ndjson')
+        parser.add_argument('--section', choices=sorted(export.SECTIONS))
+        parser.add_argument('--output', '-o', default='-', help='File to write, or - for stdout')
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f"No user named {options['username']!r}.")
+        try:
+            chunks = export.stream(user, options['format'], options['section'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        if options['output'] == '-':
+            self.write(chunks, sys.stdout.buffer)
+            return
+        with open(options['output'], 'wb') as output:
+            written = self.write(chunks, output)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} bytes to {options['output']}."))
+
+    def write(self, chunks, output):
+        written = 0
+        for chunk in chunks:
+            output.write(chunk)
+            written += len(chunk)
+        output.flush()
+        return written
@@ -0,0 +1,72 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from social.cache import get_cache
+from social.friends import get_friend_ids
+from social.profiling import stats
+
+
+class Command(BaseCommand):
+    help = 'Request pages as a user and report per-view query counts, timings and budgets.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='Paths to request (defaults to the main pages)')
+        parser.add_argument('--user', required=True, help='Username to sign in as')
+        parser.add_argument('--repeat', type=int, default=5, help='Requests per path')
+        parser.add_argument('--json', action='store_true', help='Print raw stats as JSON')
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist as exc:
+            raise CommandError(f"No user named {options['user']!r}") from exc
+
+        paths = options['paths'] or self.default_paths(user)
+        client = Client()
+        client.force_login(user)
+        stats.reset()
+        get_cache().metrics.reset()
+        # Measure even where profiling is off by default (DEBUG=False)
+        with override_settings(SOCIAL_PROFILING=True):
+            for path in paths:
+                for _ in range(options['repeat']):
+                    response = client.get(path)
+                    if response.status_code >= 400:
+                        raise CommandError(f'GET {path} returned {response.status_code}')
+
+        snapshot = stats.snapshot()
+        if options['json']:
+            self.stdout.write(json.dumps(snapshot, indent=2, sort_keys=True))
+            return
+        header = f"{'view':<24}{'reqs':>6}{'queries':>9}{'budget':>8}{'db ms':>9}{'tpl ms':>9}{'total ms':>10}"
+        self.stdout.write(header)
+        for name, entry in sorted(snapshot.items()):
+            budget = entry['budget'] if entry['budget'] is not None else '-'
+            line = (
+                f"{name:<24}{entry['requests']:>6}{entry['max_queries']:>9}{budget:>8}"
+                f"{entry['avg_db_ms']:>9.1f}{entry['avg_template_ms']:>9.1f}{entry['avg_total_ms']:>10.1f}"
+            )
+            style = self.style.ERROR if entry['over_budget'] else self.style.SUCCESS
+            self.stdout.write(style(line))
+
+        cache_stats = get_cache().metrics.snapshot()
+        if cache_stats:
+            self.stdout.write('')
+            self.stdout.write(f"{'cache':<24}{'hits':>6}{'misses':>8}{'early':>7}{'hit rate':>10}")
+            for name, entry in sorted(cache_stats.items()):
+                hit_rate = '-' if entry['hit_rate'] is None else f"{entry['hit_rate']:.0%}"
+                self.stdout.write(
+                    f"{name:<24}{entry['hits'] + entry['stale_hits']:>6}{entry['misses']:>8}"
+                    f"{entry['early_refreshes']:>7}{hit_rate:>10}"
+                )
+
+    def default_paths(self, user):
+        paths = [reverse('feed'), reverse('profile', args=[user.username]), reverse('chat_list')]
+        friend = get_user_model().objects.filter(id__in=get_friend_ids(user)).first()
+        if friend is not None:
+            paths.append(reverse('chat_thread', args=[friend.username]))
+        return paths
@@ -0,0 +1,72 @@
+from collections import Counter
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from social import search
+from social.models import Comment, Message, Post, Profile, SearchDocument, SearchTerm
+
+SOURCES = {
+    SearchDocument.POST: lambda: Post.objects.all(),
+    SearchDocument.COMMENT: lambda: Comment.objects.select_related('post'),
+    SearchDocument.MESSAGE: lambda: Message.objects.all(),
+    SearchDocument.PROFILE: lambda: Profile.objects.all(),
+}
+
+
+class Command(BaseCommand):
+    """Rebuild the search index from scratch with bulk inserts.
+
+    Signals keep the index current as rows change; this is for the first
+    build, after a tokenizer change, or after bulk loads that skip signals
+    (such as ``seed_social``).
+    """
+
+    help = 'Rebuild the full-text search index for posts, comments, messages and profiles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind',
+            action='append',
+            choices=sorted(SOURCES),
+            help='Only rebuild these kinds (repeatable; defaults to all)',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for kind in options['kind'] or sorted(SOURCES):
+            with transaction.atomic():
+                SearchTerm.objects.filter(document__kind=kind).delete()
+                SearchDocument.objects.filter(kind=kind).delete()
+                documents = self.rebuild(kind, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Indexed {documents} {kind} documents.'))
+
+    def rebuild(self, kind, batch_size):
+        rows = SOURCES[kind]().order_by('pk').iterator(chunk_size=batch_size)
+        indexed = 0
+        while batch := list(islice(rows, batch_size)):
+            documents, term_counts = [], []
+            for instance in batch:
+                text, fields = search.document_fields(instance)
+                counts = Counter(search.tokenize(text))
+                if not counts:
+                    continue
+                documents.append(
+                    SearchDocument(
+                        kind=kind, object_id=instance.pk, length=sum(counts.values()), **fields
+                    )
+                )
+                term_counts.append(counts)
+            # Generated primary keys come back from bulk_create on SQLite 3.35+ and PostgreSQL
+            SearchDocument.objects.bulk_create(documents, batch_size=batch_size)
+            SearchTerm.objects.bulk_create(
+                (
+                    SearchTerm(document=document, term=term, frequency=frequency)
+                    for document, counts in zip(documents, term_counts)
+                    for term, frequency in counts.items()
+                ),
+                batch_size=batch_size,
+            )
+            indexed += len(documents)
+        return indexed
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from social import tasks
+
+
+class Command(BaseCommand):
+    """Work through the task queue until stopped.
+
+    Each round claims up to ``--limit`` ready tasks and runs them on
+    ``--threads`` threads, ``--batch-size`` payloads per batch task at a time.
+    Start more processes for more parallelism: claims are leased in the
+    database, so workers never share a task.
+    """
+
+    help = 'Run queued background tasks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--limit', type=int, default=500)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--once', action='store_true', help='Drain the ready tasks and exit.')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            start = time.perf_counter()
+            succeeded, claimed = tasks.run_pending(
+                limit=options['limit'], batch_size=options['batch_size'], threads=options['threads']
+            )
+            total += succeeded
+            if claimed:
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f'Ran {succeeded}/{claimed} tasks in {elapsed:.2f}s.')
+                continue
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS(f'Ran {total} tasks.'))
@@ -0,0 +1,223 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import Truncator
+
+from social import ranking
+from social.models import (
+    Comment,
+    Conversation,
+    ConversationMember,
+    FriendRequest,
+    Friendship,
+    Like,
+    Message,
+    Post,
+    Profile,
+    TimelineEntry,
+)
+
+BATCH_SIZE = 2000
+
+
+class Command(BaseCommand):
+    """Generate users, friendships, posts, likes, comments and chats in bulk.
+
+    ``bulk_create`` skips ``save()`` and signals, so the derived tables
+    (profiles, friendship edges, timelines, counters and inbox rows) are
+    written here directly. Generated primary keys are read back from
+    ``bulk_create``, which needs SQLite 3.35+ or PostgreSQL.
+    """
+
+    help = 'Seed a reproducible synthetic social graph with bulk inserts for benchmarking.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--friends', type=int, default=10, help='Average friends per user')
+        parser.add_argument('--posts', type=int, default=5, help='Posts per user')
+        parser.add_argument('--likes', type=int, default=5, help='Average likes per post')
+        parser.add_argument('--comments', type=int, default=2, help='Average comments per post')
+        parser.add_argument('--chats', type=int, default=3, help='Conversations started per user')
+        parser.add_argument('--messages', type=int, default=20, help='Messages per conversation')
+        parser.add_argument('--days', type=int, default=30, help='Spread content over this many days')
+        parser.add_argument('--prefix', default='seed', help='Username prefix for generated users')
+        parser.add_argument('--password', default='pass123')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for reproducible data')
+
+    def handle(self, *args, **options):
+        if get_user_model().objects.filter(username__startswith=options['prefix']).exists():
+            raise CommandError(
+                f"Users prefixed {options['prefix']!r} already exist; pick another --prefix."
+            )
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.span = timedelta(days=options['days'])
+        with transaction.atomic():
+            users = self.create_users(options)
+            friends = self.create_friendships(users, options['friends'])
+            posts = self.create_posts(users, friends, options['posts'])
+            self.create_likes_and_comments(users, posts, options['likes'], options['comments'])
+            self.create_conversations(friends, options['chats'], options['messages'])
+        # The search index, feed scores and suggestions are derived too; rebuild them in bulk
+        call_command('reindex_search', stdout=self.stdout)
+        call_command('decay_feed_scores', stdout=self.stdout)
+        call_command('compute_friend_suggestions', stdout=self.stdout)
+        friendships = sum(map(len, friends.values())) // 2
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Seeded {len(users)} users, {friendships} friendships and {len(posts)} posts '
+                f'(first user: {users[0].username}).'
+            )
+        )
+
+    def random_time(self):
+        return self.now - self.span * self.rng.random()
+
+    def create_users(self, options):
+        User = get_user_model()
+        password = make_password(options['password'])
+        prefix = options['prefix']
+        users = [
+            User(username=f'{prefix}{index}', email=f'{prefix}{index}@example.com', password=password)
+            for index in range(options['users'])
+        ]
+        users = User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        # bulk_create skips the post_save signal that normally creates profiles
+        Profile.objects.bulk_create([Profile(user=user) for user in users], batch_size=BATCH_SIZE)
+        return users
+
+    def create_friendships(self, users, degree):
+        friends = {user.pk: set() for user in users}
+        ids = list(friends)
+        target_edges = len(ids) * degree // 2
+        requests, edges = [], []
+        attempts = 0
+        while len(requests) < target_edges and attempts < target_edges * 10:
+            attempts += 1
+            a, b = self.rng.sample(ids, 2)
+            if b in friends[a]:
+                continue
+            friends[a].add(b)
+            friends[b].add(a)
+            responded = self.random_time()
+            requests.append(
+                FriendRequest(
+                    sender_id=a,
+                    receiver_id=b,
+                    status=FriendRequest.ACCEPTED,
+                    created_at=responded,
+                    responded_at=responded,
+                )
+            )
+            edges += [Friendship(user_id=a, friend_id=b), Friendship(user_id=b, friend_id=a)]
+        FriendRequest.objects.bulk_create(requests, batch_size=BATCH_SIZE)
+        Friendship.objects.bulk_create(edges, batch_size=BATCH_SIZE)
+        return friends
+
+    def create_posts(self, users, friends, per_user):
+        posts = [
+            Post(
+                author=user,
+                message=f'Update {index} from {user.username}',
+                created_at=self.random_time(),
+                visibility=self.rng.choice(('public', 'friends')),
+            )
+            for user in users
+            for index in range(per_user)
+        ]
+        posts = Post.objects.bulk_create(posts, batch_size=BATCH_SIZE)
+        # One mutual-friend count per author, as jobs.fan_out_posts does
+        affinities = {
+            user.pk: ranking.affinities(user.pk, friends[user.pk] | {user.pk}) for user in users
+        }
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry.for_reader(owner_id, post, affinity)
+                for post in posts
+                for owner_id, affinity in affinities[post.author_id].items()
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        return posts
+
+    def create_likes_and_comments(self, users, posts, likes_per_post, comments_per_post):
+        likes, comments = [], []
+        for post in posts:
+            likers = self.rng.sample(users, min(len(users), self.rng.randint(0, likes_per_post * 2)))
+            likes += [Like(user=user, post=post, created_at=post.created_at) for user in likers]
+            post.like_count = len(likers)
+            post.comment_count = self.rng.randint(0, comments_per_post * 2)
+            comments += [
+                Comment(
+                    author=self.rng.choice(users),
+                    post=post,
+                    text=f'Comment {index}',
+                    created_at=post.created_at,
+                )
+                for index in range(post.comment_count)
+            ]
+        Like.objects.bulk_create(likes, batch_size=BATCH_SIZE)
+        Comment.objects.bulk_create(comments, batch_size=BATCH_SIZE)
+        Post.objects.bulk_update(posts, ['like_count', 'comment_count'], batch_size=BATCH_SIZE)
+
+    def create_conversations(self, friends, per_user, per_conversation):
+        pairs = set()
+        for user_id, friend_ids in friends.items():
+            for friend_id in self.rng.sample(sorted(friend_ids), min(per_user, len(friend_ids))):
+                pairs.add((min(user_id, friend_id), max(user_id, friend_id)))
+        conversations = Conversation.objects.bulk_create(
+            [
+                Conversation(user_low_id=low, user_high_id=high, created_at=self.now - self.span)
+                for low, high in sorted(pairs)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+        Through = Conversation.participants.through
+        through_rows, messages = [], []
+        for conversation in conversations:
+            pair = (conversation.user_low_id, conversation.user_high_id)
+            through_rows += [Through(conversation=conversation, user_id=user_id) for user_id in pair]
+            start = self.now - self.span
+            step = self.span / (per_conversation + 1)
+            messages += [
+                Message(
+                    conversation=conversation,
+                    sender_id=self.rng.choice(pair),
+                    body=f'Message {index}',
+                    created_at=start + step * (index + 1),
+                )
+                for index in range(per_conversation)
+            ]
+        Through.objects.bulk_create(through_rows, batch_size=BATCH_SIZE)
+        # bulk_create bypasses Message.save, so build the inbox rows directly
+        Message.objects.bulk_create(messages, batch_size=BATCH_SIZE)
+
+        last_messages = {}
+        for message in messages:
+            last_messages[message.conversation_id] = message
+        members = []
+        for conversation in conversations:
+            last = last_messages.get(conversation.pk)
+            preview = Truncator(last.body).chars(ConversationMember.PREVIEW_LENGTH) if last else ''
+            pair = (conversation.user_low_id, conversation.user_high_id)
+            for user_id, other_id in (pair, pair[::-1]):
+                members.append(
+                    ConversationMember(
+                        conversation=conversation,
+                        user_id=user_id,
+                        other_user_id=other_id,
+                        last_message=last,
+                        last_message_preview=preview,
+                        last_message_at=last.created_at if last else None,
+                        last_read_message_id=last.pk if last else None,
+                        last_activity_at=last.created_at if last else conversation.created_at,
+                    )
+                )
+        ConversationMember.objects.bulk_create(members, batch_size=BATCH_SIZE)
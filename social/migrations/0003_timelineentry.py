@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_timelines(apps, schema_editor):
+    """Materialize timelines for posts written before fan-out existed."""
+
+    Post = apps.get_model('social', 'Post')
+    FriendRequest = apps.get_model('social', 'FriendRequest')
+    TimelineEntry = apps.get_model('social', 'TimelineEntry')
+
+    friends = {}
+    accepted = FriendRequest.objects.filter(status='accepted').values_list('sender_id', 'receiver_id')
+    for sender_id, receiver_id in accepted:
+        friends.setdefault(sender_id, set()).add(receiver_id)
+        friends.setdefault(receiver_id, set()).add(sender_id)
+
+    batch = []
+    for post_id, author_id, created_at in Post.objects.values_list('id', 'author_id', 'created_at').iterator():
+        for owner_id in friends.get(author_id, set()) | {author_id}:
+            batch.append(TimelineEntry(owner_id=owner_id, post_id=post_id, created_at=created_at))
+        if len(batch) >= 1000:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('social', '0002_conversation_message'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='social.post')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', '-created_at', '-post'], name='social_timeline_seek_idx')],
+                'unique_together': {('owner', 'post')},
+            },
+        ),
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
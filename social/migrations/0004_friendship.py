@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_friendships(apps, schema_editor):
+    """Create both edge directions for every accepted friend request."""
+
+    FriendRequest = apps.get_model('social', 'FriendRequest')
+    Friendship = apps.get_model('social', 'Friendship')
+
+    edges = []
+    accepted = FriendRequest.objects.filter(status='accepted').values_list('sender_id', 'receiver_id')
+    for sender_id, receiver_id in accepted.iterator():
+        edges.append(Friendship(user_id=sender_id, friend_id=receiver_id))
+        edges.append(Friendship(user_id=receiver_id, friend_id=sender_id))
+    Friendship.objects.bulk_create(edges, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('social', '0003_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Friendship',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('friend', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='friendships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'friend')},
+            },
+        ),
+        migrations.RunPython(backfill_friendships, migrations.RunPython.noop),
+    ]
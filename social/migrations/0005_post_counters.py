@@ -0,0 +1,39 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    """Seed the stored counters from the existing likes and comments."""
+
+    Post = apps.get_model('social', 'Post')
+    Like = apps.get_model('social', 'Like')
+    Comment = apps.get_model('social', 'Comment')
+
+    like_totals = Like.objects.filter(post=OuterRef('pk')).values('post').annotate(total=Count('pk'))
+    comment_totals = Comment.objects.filter(post=OuterRef('pk')).values('post').annotate(total=Count('pk'))
+    Post.objects.update(
+        like_count=Coalesce(Subquery(like_totals.values('total')), 0),
+        comment_count=Coalesce(Subquery(comment_totals.values('total')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0004_friendship'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+from django.utils.text import Truncator
+
+
+def backfill_members(apps, schema_editor):
+    """Build inbox rows for conversations that predate the summary table."""
+
+    Conversation = apps.get_model('social', 'Conversation')
+    Message = apps.get_model('social', 'Message')
+    ConversationMember = apps.get_model('social', 'ConversationMember')
+
+    members = []
+    for conversation in Conversation.objects.prefetch_related('participants').iterator(chunk_size=500):
+        participant_ids = [user.pk for user in conversation.participants.all()]
+        last = Message.objects.filter(conversation=conversation).order_by('-created_at', '-id').first()
+        for user_id in participant_ids:
+            others = [pk for pk in participant_ids if pk != user_id]
+            members.append(
+                ConversationMember(
+                    conversation=conversation,
+                    user_id=user_id,
+                    other_user_id=others[0] if others else None,
+                    last_message=last,
+                    last_message_preview=Truncator(last.body).chars(120) if last else '',
+                    last_message_at=last.created_at if last else None,
+                    last_activity_at=last.created_at if last else conversation.created_at,
+                )
+            )
+    ConversationMember.objects.bulk_create(members, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('social', '0005_post_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_preview', models.CharField(blank=True, max_length=120)),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('last_activity_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members', to='social.conversation')),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='social.message')),
+                ('other_user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-last_activity_at'], name='social_inbox_activity_idx')],
+                'unique_together': {('conversation', 'user')},
+            },
+        ),
+        migrations.RunPython(backfill_members, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_pair_keys(apps, schema_editor):
+    """Key existing two-person chats; later duplicates of a pair stay unkeyed."""
+
+    Conversation = apps.get_model('social', 'Conversation')
+
+    seen = set()
+    conversations = Conversation.objects.prefetch_related('participants').order_by('created_at', 'id')
+    for conversation in conversations.iterator(chunk_size=500):
+        participant_ids = sorted(user.pk for user in conversation.participants.all())
+        if len(participant_ids) != 2 or tuple(participant_ids) in seen:
+            continue
+        seen.add(tuple(participant_ids))
+        conversation.user_low_id, conversation.user_high_id = participant_ids
+        conversation.save(update_fields=['user_low', 'user_high'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('social', '0006_conversationmember'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='user_high',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='user_low',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_pair_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('user_low', 'user_high'), name='social_direct_conversation_pair'),
+        ),
+    ]
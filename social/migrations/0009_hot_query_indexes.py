@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0008_message_seek_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created_at'], name='social_comment_post_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendrequest',
+            index=models.Index(fields=['receiver', 'status'], name='social_request_receiver_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendrequest',
+            index=models.Index(fields=['sender', 'status'], name='social_request_sender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['visibility', 'created_at', 'id'], name='social_post_visibility_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'created_at'], name='social_post_author_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+TOP_K = 10
+
+
+def backfill_suggestions(apps, schema_editor):
+    """Rank friends of friends by mutual friends for every user."""
+
+    from collections import Counter, defaultdict
+
+    Friendship = apps.get_model('social', 'Friendship')
+    FriendRequest = apps.get_model('social', 'FriendRequest')
+    FriendSuggestion = apps.get_model('social', 'FriendSuggestion')
+
+    graph = defaultdict(set)
+    for user_id, friend_id in Friendship.objects.values_list('user_id', 'friend_id').iterator():
+        graph[user_id].add(friend_id)
+    pending = defaultdict(set)
+    for sender_id, receiver_id in FriendRequest.objects.filter(status='pending').values_list(
+        'sender_id', 'receiver_id'
+    ):
+        pending[sender_id].add(receiver_id)
+        pending[receiver_id].add(sender_id)
+
+    rows = []
+    for user_id, friends in graph.items():
+        mutual = Counter()
+        for friend_id in friends:
+            mutual.update(graph[friend_id])
+        for skip in (user_id, *friends, *pending[user_id]):
+            mutual.pop(skip, None)
+        ranked = sorted(mutual.items(), key=lambda item: (-item[1], item[0]))[:TOP_K]
+        rows += [
+            FriendSuggestion(user_id=user_id, candidate_id=candidate_id, mutual_count=count)
+            for candidate_id, count in ranked
+        ]
+    FriendSuggestion.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('social', '0011_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FriendSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mutual_count', models.PositiveIntegerField()),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='friend_suggestions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-mutual_count', 'candidate_id'],
+                'indexes': [models.Index(fields=['user', '-mutual_count', 'candidate'], name='social_suggestion_rank_idx')],
+                'unique_together': {('user', 'candidate')},
+            },
+        ),
+        migrations.RunPython(backfill_suggestions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('social', '0013_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='unread_notifications',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('like', 'Like'), ('comment', 'Comment'), ('friend_request', 'Friend request'), ('friend_accepted', 'Friend request accepted'), ('message', 'Message')], max_length=20)),
+                ('target_id', models.PositiveBigIntegerField()),
+                ('actor_ids', models.JSONField(default=list)),
+                ('actor_count', models.PositiveIntegerField(default=0)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('is_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-updated_at', '-id'],
+                'indexes': [models.Index(fields=['recipient', '-updated_at', '-id'], name='social_notification_seek_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_read', False)), fields=('recipient', 'kind', 'target_id'), name='social_notification_unread_uniq'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_read_positions(apps, schema_editor):
+    """Treat conversations with nothing unread as read up to their last message."""
+
+    ConversationMember = apps.get_model('social', 'ConversationMember')
+    ConversationMember.objects.filter(unread_count=0).update(last_read_message_id=F('last_message_id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0014_notification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationmember',
+            name='last_read_message_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_read_positions, migrations.RunPython.noop),
+    ]
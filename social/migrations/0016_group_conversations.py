@@ -0,0 +1,43 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.utils.timezone
+
+
+def backfill_joined_at(apps, schema_editor):
+    """Existing members joined when their conversation was created."""
+
+    Conversation = apps.get_model('social', 'Conversation')
+    ConversationMember = apps.get_model('social', 'ConversationMember')
+    created = Conversation.objects.filter(pk=OuterRef('conversation_id')).values('created_at')
+    ConversationMember.objects.update(joined_at=Subquery(created[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0015_conversationmember_last_read'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='kind',
+            field=models.CharField(choices=[('direct', 'Direct'), ('group', 'Group')], default='direct', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='title',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='conversationmember',
+            name='joined_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='conversationmember',
+            name='role',
+            field=models.CharField(choices=[('owner', 'Owner'), ('admin', 'Admin'), ('member', 'Member')], default='member', max_length=10),
+        ),
+        migrations.RunPython(backfill_joined_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0016_group_conversations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='affinity',
+            field=models.FloatField(default=1),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['visibility', '-score', '-id'], name='social_post_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['owner', '-score', '-post'], name='social_timeline_rank_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0017_ranked_feed_scores'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='archived_until',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='MessageSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_created_at', models.DateTimeField()),
+                ('first_message_id', models.PositiveBigIntegerField()),
+                ('last_created_at', models.DateTimeField()),
+                ('last_message_id', models.PositiveBigIntegerField()),
+                ('message_count', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments', to='social.conversation')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['conversation', 'first_created_at', 'first_message_id'], name='social_segment_seek_idx')],
+            },
+        ),
+    ]
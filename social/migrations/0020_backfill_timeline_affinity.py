@@ -0,0 +1,42 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import F, OuterRef, Subquery
+
+
+def backfill_affinity(apps, schema_editor):
+    """Give timeline entries written before ranking the affinity fan-out would give them now."""
+
+    from social.ranking import affinity
+
+    Friendship = apps.get_model('social', 'Friendship')
+    TimelineEntry = apps.get_model('social', 'TimelineEntry')
+    Post = apps.get_model('social', 'Post')
+
+    graph = defaultdict(set)
+    for user_id, friend_id in Friendship.objects.values_list('user_id', 'friend_id').iterator():
+        graph[user_id].add(friend_id)
+
+    # Entries grouped by how many friends their owner shares with the author
+    by_mutual = defaultdict(list)
+    entries = TimelineEntry.objects.values_list('pk', 'owner_id', 'post__author_id')
+    for pk, owner_id, author_id in entries.iterator():
+        mutual = 0 if owner_id == author_id else len(graph[owner_id] & graph[author_id])
+        by_mutual[mutual].append(pk)
+    for mutual, pks in by_mutual.items():
+        for start in range(0, len(pks), 500):
+            TimelineEntry.objects.filter(pk__in=pks[start : start + 500]).update(affinity=affinity(mutual))
+
+    post_scores = Post.objects.filter(pk=OuterRef('post_id')).values('score')[:1]
+    TimelineEntry.objects.update(score=F('affinity') * Subquery(post_scores))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0019_profile_avatar_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_affinity, migrations.RunPython.noop),
+    ]
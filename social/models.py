@@ -1,7 +1,11 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.text import Truncator
 
 User = get_user_model()
 
@@ -15,10 +19,23 @@ class Profile(models.Model):
     job_title = models.CharField(max_length=100, blank=True)
     portfolio_url = models.URLField(blank=True)
     avatar = models.URLField(blank=True, help_text='Link to a profile photo or logo')
+    # SHA-256 of an uploaded avatar in social.avatars' content-addressed store
+    avatar_hash = models.CharField(max_length=64, blank=True, editable=False)
+    # Unread rows in Notification, kept in step with F() updates for the navbar badge
+    unread_notifications = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"Profile for {self.user.username}"
 
+    def avatar_src(self, size='sm'):
+        """URL of the uploaded avatar's ``size`` variant, else the linked avatar, else ``''``."""
+
+        if self.avatar_hash:
+            from . import avatars
+
+            return avatars.url(self.avatar_hash, size)
+        return self.avatar
+
 
 class Post(models.Model):
     """A short update that can be public or only visible to friends."""
@@ -31,13 +48,124 @@ class Post(models.Model):
         choices=(('public', 'Public'), ('friends', 'Friends Only')),
         default='public',
     )
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Bumped on every change that alters how the post renders; keys its cached fragments
+    version = models.PositiveIntegerField(default=1, editable=False)
+    # Time-decayed engagement score for the ranked feed, see social/ranking.py
+    score = models.FloatField(default=0, editable=False)
+
+    # Maintained with F() updates and bulk_update, never written back by save()
+    COUNTER_FIELDS = ('like_count', 'comment_count', 'score')
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['visibility', 'created_at', 'id'], name='social_post_visibility_idx'),
+            models.Index(fields=['visibility', '-score', '-id'], name='social_post_rank_idx'),
+            models.Index(fields=['author', 'created_at'], name='social_post_author_idx'),
+        ]
 
     def __str__(self):
         return f"Post by {self.author.username} at {self.created_at:%Y-%m-%d %H:%M}"
 
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            from .ranking import hot_score
+
+            self.score = hot_score(self.like_count, self.comment_count, self.created_at)
+            super().save(*args, **kwargs)
+            return
+        # Counters move with F() updates and the version is bumped in the
+        # database, so saving a stale instance cannot roll any of them back
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            update_fields = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        kwargs['update_fields'] = {*update_fields, 'version'}
+        self.version = F('version') + 1
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=['version'])
+
+
+class TimelineEntry(models.Model):
+    """A post pushed into one reader's materialized feed when it is written.
+
+    ``created_at`` is copied from the post so the feed can be read with a
+    single index range scan on ``(owner, created_at, post)`` without joining
+    back to ``Post`` to sort. ``score`` is the post's score weighted by the
+    reader's ``affinity`` for its author and serves the ranked feed the same
+    way.
+    """
+
+    BACKFILL_LIMIT = 200
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name='timeline', on_delete=models.CASCADE
+    )
+    post = models.ForeignKey(Post, related_name='timeline_entries', on_delete=models.CASCADE)
+    created_at = models.DateTimeField()
+    affinity = models.FloatField(default=1)
+    score = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ('owner', 'post')
+        indexes = [
+            models.Index(
+                fields=['owner', '-created_at', '-post'], name='social_timeline_seek_idx'
+            ),
+            models.Index(fields=['owner', '-score', '-post'], name='social_timeline_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"Post {self.post_id} in {self.owner_id}'s timeline"
+
+    @classmethod
+    def for_reader(cls, owner_id, post, affinity):
+        return cls(
+            owner_id=owner_id,
+            post=post,
+            created_at=post.created_at,
+            affinity=affinity,
+            score=post.score * affinity,
+        )
+
+    @classmethod
+    def fan_out(cls, post, owner_ids):
+        """Push a freshly written post into each reader's timeline."""
+
+        from .ranking import affinities
+
+        cls.objects.bulk_create(
+            [
+                cls.for_reader(owner_id, post, affinity)
+                for owner_id, affinity in affinities(post.author_id, owner_ids).items()
+            ],
+            ignore_conflicts=True,
+        )
+
+    @classmethod
+    def backfill(cls, owner_id, author_id, limit=BACKFILL_LIMIT):
+        """Copy an author's recent posts into a new friend's timeline."""
+
+        from .ranking import affinities
+
+        affinity = affinities(author_id, [owner_id])[owner_id]
+        recent = Post.objects.filter(author_id=author_id).only('created_at', 'score')[:limit]
+        cls.objects.bulk_create(
+            [cls.for_reader(owner_id, post, affinity) for post in recent],
+            ignore_conflicts=True,
+        )
+
+    @classmethod
+    def prune(cls, owner_id, author_id):
+        """Drop an author's posts from a timeline once the two are no longer friends."""
+
+        cls.objects.filter(owner_id=owner_id, post__author_id=author_id).delete()
+
 
 class Comment(models.Model):
     """Simple responses people leave on posts."""
@@ -49,6 +177,9 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['post', 'created_at'], name='social_comment_post_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author.username}"
@@ -89,6 +220,10 @@ class FriendRequest(models.Model):
 
     class Meta:
         unique_together = ('sender', 'receiver')
+        indexes = [
+            models.Index(fields=['receiver', 'status'], name='social_request_receiver_idx'),
+            models.Index(fields=['sender', 'status'], name='social_request_sender_idx'),
+        ]
 
     def accept(self):
         self.status = self.ACCEPTED
@@ -104,34 +239,208 @@ class FriendRequest(models.Model):
         return f"{self.sender} ➜ {self.receiver} ({self.status})"
 
 
+class Friendship(models.Model):
+    """One direction of an accepted friendship.
+
+    Every friendship is stored as two rows, ``(a, b)`` and ``(b, a)``, so a
+    user's friends are a single index range scan on ``user`` instead of a
+    union of sent and received ``FriendRequest`` rows.
+    """
+
+    user = models.ForeignKey(User, related_name='friendships', on_delete=models.CASCADE)
+    friend = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('user', 'friend')
+
+    def __str__(self):
+        return f"{self.user_id} ↔ {self.friend_id}"
+
+    @classmethod
+    def connect(cls, user_a, user_b):
+        cls.objects.bulk_create(
+            [cls(user=user_a, friend=user_b), cls(user=user_b, friend=user_a)],
+            ignore_conflicts=True,
+        )
+
+    @classmethod
+    def disconnect(cls, user_a, user_b):
+        cls.objects.filter(
+            Q(user=user_a, friend=user_b) | Q(user=user_b, friend=user_a)
+        ).delete()
+
+
+class FriendSuggestion(models.Model):
+    """A precomputed "people you may know" candidate, scored by mutual friends."""
+
+    user = models.ForeignKey(User, related_name='friend_suggestions', on_delete=models.CASCADE)
+    candidate = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    mutual_count = models.PositiveIntegerField()
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('user', 'candidate')
+        ordering = ['-mutual_count', 'candidate_id']
+        indexes = [
+            models.Index(fields=['user', '-mutual_count', 'candidate'], name='social_suggestion_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.candidate_id} for {self.user_id} ({self.mutual_count} mutual)"
+
+
 class Conversation(models.Model):
-    """Private chat room for two friends."""
+    """Private chat room for two friends, or a named group chat.
 
+    ``user_low``/``user_high`` hold the pair's user IDs in ascending order so a
+    direct conversation is found with one probe of a unique index, and two
+    first messages sent at the same time cannot create two rooms. Groups leave
+    them empty; who belongs to a group is read from ``ConversationMember``.
+    """
+
+    DIRECT = 'direct'
+    GROUP = 'group'
+
+    KINDS = (
+        (DIRECT, 'Direct'),
+        (GROUP, 'Group'),
+    )
+
+    MAX_GROUP_MEMBERS = 50
+
+    kind = models.CharField(max_length=10, choices=KINDS, default=DIRECT)
+    title = models.CharField(max_length=100, blank=True)
     participants = models.ManyToManyField(User, related_name='conversations')
+    user_low = models.ForeignKey(
+        User, related_name='+', null=True, blank=True, editable=False, on_delete=models.CASCADE
+    )
+    user_high = models.ForeignKey(
+        User, related_name='+', null=True, blank=True, editable=False, on_delete=models.CASCADE
+    )
     created_at = models.DateTimeField(default=timezone.now)
+    # Newest message moved into MessageSegment; threads only read the archive before it
+    archived_until = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user_low', 'user_high'], name='social_direct_conversation_pair'
+            ),
+        ]
 
     def __str__(self):
+        if self.is_group:
+            return self.title
         participants = ', '.join(self.participants.values_list('username', flat=True))
         return f"Conversation between {participants}"
 
+    @property
+    def is_group(self):
+        return self.kind == self.GROUP
+
     @classmethod
     def between(cls, user_a, user_b):
         """Find the shared chat for two users or create one."""
 
-        conversation = (
-            cls.objects.filter(participants=user_a)
-            .filter(participants=user_b)
-            .first()
-        )
-        if conversation:
-            return conversation, False
-        conversation = cls.objects.create()
-        conversation.participants.set([user_a, user_b])
+        user_low, user_high = sorted((user_a, user_b), key=lambda user: user.pk)
+        try:
+            return cls.objects.get(user_low=user_low, user_high=user_high), False
+        except cls.DoesNotExist:
+            pass
+        try:
+            with transaction.atomic():
+                conversation = cls.objects.create(user_low=user_low, user_high=user_high)
+                conversation.participants.set([user_a, user_b])
+                ConversationMember.objects.bulk_create(
+                    [
+                        ConversationMember(conversation=conversation, user=user_a, other_user=user_b),
+                        ConversationMember(conversation=conversation, user=user_b, other_user=user_a),
+                    ]
+                )
+        except IntegrityError:
+            # Another request created the room between our lookup and insert
+            return cls.objects.get(user_low=user_low, user_high=user_high), False
         return conversation, True
 
+    @classmethod
+    def create_group(cls, owner, title, members):
+        """Start a group chat owned by ``owner`` with ``members``."""
+
+        members = [member for member in dict.fromkeys(members) if member != owner]
+        now = timezone.now()
+        with transaction.atomic():
+            conversation = cls.objects.create(kind=cls.GROUP, title=title, created_at=now)
+            conversation.participants.set([owner, *members])
+            ConversationMember.objects.bulk_create(
+                [
+                    ConversationMember(
+                        conversation=conversation,
+                        user=user,
+                        role=ConversationMember.OWNER if user == owner else ConversationMember.MEMBER,
+                        joined_at=now,
+                        last_activity_at=now,
+                    )
+                    for user in (owner, *members)
+                ]
+            )
+        return conversation
+
+    def member_ids(self):
+        return set(ConversationMember.objects.filter(conversation=self).values_list('user_id', flat=True))
+
+    def add_member(self, user, role=None):
+        """Add ``user`` to a group, starting their inbox row at the latest message.
+
+        Returns ``False`` if they were already a member.
+        """
+
+        from .cache import store
+
+        summary = (
+            ConversationMember.objects.filter(conversation=self)
+            .values('last_message_id', 'last_message_preview', 'last_message_at')
+            .first()
+        ) or {}
+        try:
+            with transaction.atomic():
+                ConversationMember.objects.create(
+                    conversation=self,
+                    user=user,
+                    role=role or ConversationMember.MEMBER,
+                    last_read_message_id=summary.get('last_message_id'),
+                    **summary,
+                )
+                self.participants.add(user)
+        except IntegrityError:
+            return False
+        store.invalidate_inbox(user.pk)
+        return True
+
+    def remove_member(self, user):
+        """Take ``user`` out of a group; if the owner leaves, the longest-standing member takes over."""
+
+        from .cache import store
+
+        with transaction.atomic():
+            member = ConversationMember.objects.filter(conversation=self, user=user).first()
+            if member is None:
+                return False
+            member.delete()
+            self.participants.remove(user)
+            if member.role == ConversationMember.OWNER:
+                successor = (
+                    ConversationMember.objects.filter(conversation=self)
+                    .order_by('joined_at', 'id')
+                    .values_list('pk', flat=True)
+                    .first()
+                )
+                if successor is not None:
+                    ConversationMember.objects.filter(pk=successor).update(role=ConversationMember.OWNER)
+        store.invalidate_inbox(user.pk)
+        return True
+
 
 class Message(models.Model):
     """One chat bubble sent inside a conversation."""
@@ -145,10 +454,362 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(
+                fields=['conversation', 'created_at', 'id'], name='social_message_seek_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender} at {self.created_at:%Y-%m-%d %H:%M}"
-from django.db.models.signals import post_save
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                ConversationMember.record_message(self)
+
+
+class ConversationMember(models.Model):
+    """A participant's inbox row for one conversation.
+
+    Holds everything the inbox needs to draw a line for the thread (the other
+    person, a preview of the last message and the unread count) so listing
+    conversations never touches the messages table, plus the newest message
+    the participant has seen, which the other side shows as a read receipt.
+    """
+
+    PREVIEW_LENGTH = 120
+
+    OWNER = 'owner'
+    ADMIN = 'admin'
+    MEMBER = 'member'
+
+    ROLES = (
+        (OWNER, 'Owner'),
+        (ADMIN, 'Admin'),
+        (MEMBER, 'Member'),
+    )
+
+    conversation = models.ForeignKey(
+        Conversation, related_name='members', on_delete=models.CASCADE
+    )
+    user = models.ForeignKey(User, related_name='inbox', on_delete=models.CASCADE)
+    role = models.CharField(max_length=10, choices=ROLES, default=MEMBER)
+    joined_at = models.DateTimeField(default=timezone.now)
+    other_user = models.ForeignKey(
+        User, related_name='+', null=True, blank=True, on_delete=models.CASCADE
+    )
+    last_message = models.ForeignKey(
+        Message, related_name='+', null=True, blank=True, on_delete=models.SET_NULL
+    )
+    last_message_preview = models.CharField(max_length=PREVIEW_LENGTH, blank=True)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    last_activity_at = models.DateTimeField(default=timezone.now)
+    unread_count = models.PositiveIntegerField(default=0)
+    # A plain id rather than a foreign key so it outlives archived messages
+    last_read_message_id = models.PositiveBigIntegerField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('conversation', 'user')
+        indexes = [
+            models.Index(fields=['user', '-last_activity_at'], name='social_inbox_activity_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} in conversation {self.conversation_id}"
+
+    @property
+    def can_manage(self):
+        return self.role in (self.OWNER, self.ADMIN)
+
+    @classmethod
+    def record_message(cls, message):
+        """Update every participant's summary for a new message in one statement."""
+
+        from .cache import store
+
+        cls.objects.filter(conversation_id=message.conversation_id).update(
+            last_message=message,
+            last_message_preview=Truncator(message.body).chars(cls.PREVIEW_LENGTH),
+            last_message_at=message.created_at,
+            last_activity_at=message.created_at,
+            unread_count=Case(
+                When(user_id=message.sender_id, then=Value(0)),
+                default=F('unread_count') + 1,
+            ),
+            last_read_message_id=Case(
+                When(user_id=message.sender_id, then=Value(message.pk)),
+                default=F('last_read_message_id'),
+                output_field=models.PositiveBigIntegerField(),
+            ),
+        )
+        conversation = message.conversation
+        if conversation.is_group:
+            store.invalidate_inbox(*conversation.member_ids())
+        else:
+            store.invalidate_inbox(conversation.user_low_id, conversation.user_high_id)
+
+    @classmethod
+    def mark_read(cls, conversation, user):
+        """Mark the whole conversation read for ``user`` straight away."""
+
+        from .cache import store
+
+        updated = cls.objects.filter(
+            conversation=conversation, user=user, unread_count__gt=0
+        ).update(unread_count=0, last_read_message_id=F('last_message_id'))
+        if updated:
+            store.invalidate_inbox(user.pk)
+
+    @classmethod
+    def record_reads(cls, reads):
+        """Apply ``{(conversation_id, user_id): message_id}`` read positions in one UPDATE.
+
+        Positions only move forward, and the unread count is cleared only
+        where no newer message has arrived since.
+        """
+
+        from .cache import store
+
+        if not reads:
+            return 0
+        position = models.PositiveBigIntegerField()
+        match = Q()
+        read_position, unread = [], []
+        for (conversation_id, user_id), message_id in reads.items():
+            row = Q(conversation_id=conversation_id, user_id=user_id)
+            match |= row
+            read_position.append(
+                When(
+                    row,
+                    then=Greatest(
+                        Coalesce('last_read_message_id', Value(0), output_field=position),
+                        Value(message_id),
+                        output_field=position,
+                    ),
+                )
+            )
+            unread.append(When(row, last_message_id__lte=message_id, then=Value(0)))
+        updated = cls.objects.filter(match).update(
+            last_read_message_id=Case(
+                *read_position, default=F('last_read_message_id'), output_field=position
+            ),
+            unread_count=Case(*unread, default=F('unread_count'), output_field=models.PositiveIntegerField()),
+        )
+        store.invalidate_inbox(*{user_id for _, user_id in reads})
+        return updated
+
+
+class MessageSegment(models.Model):
+    """A compressed run of a conversation's oldest messages, moved out of ``Message``.
+
+    Segments of one conversation never overlap and are only ever added after
+    the newest one, which is topped up until it holds ``social.archive.SEGMENT_SIZE``
+    messages. The index on each segment's first ``(created_at, id)`` key is a
+    sparse index over the archived messages: one entry per segment rather than
+    one per message.
+    """
+
+    conversation = models.ForeignKey(
+        Conversation, related_name='segments', on_delete=models.CASCADE
+    )
+    first_created_at = models.DateTimeField()
+    first_message_id = models.PositiveBigIntegerField()
+    last_created_at = models.DateTimeField()
+    last_message_id = models.PositiveBigIntegerField()
+    message_count = models.PositiveIntegerField()
+    # zlib-compressed JSON list of [id, sender_id, created_at, body]
+    data = models.BinaryField()
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['conversation', 'first_created_at', 'first_message_id'],
+                name='social_segment_seek_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.message_count} messages of conversation {self.conversation_id}"
+
+
+class SearchDocument(models.Model):
+    """One searchable post, comment, message or profile and who may see it."""
+
+    POST = 'post'
+    COMMENT = 'comment'
+    MESSAGE = 'message'
+    PROFILE = 'profile'
+
+    KINDS = (
+        (POST, 'Post'),
+        (COMMENT, 'Comment'),
+        (MESSAGE, 'Message'),
+        (PROFILE, 'Profile'),
+    )
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.PositiveBigIntegerField()
+    # Visible to everyone, to the audience and their friends, or to a conversation
+    is_public = models.BooleanField(default=False)
+    audience = models.ForeignKey(
+        User, related_name='+', null=True, blank=True, on_delete=models.CASCADE
+    )
+    conversation = models.ForeignKey(
+        Conversation, related_name='+', null=True, blank=True, on_delete=models.CASCADE
+    )
+    length = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('kind', 'object_id')
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
+
+
+class SearchTerm(models.Model):
+    """Posting for one term in one search document."""
+
+    document = models.ForeignKey(SearchDocument, related_name='terms', on_delete=models.CASCADE)
+    term = models.CharField(max_length=64)
+    frequency = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'document'], name='social_search_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} in {self.document}"
+
+
+class Notification(models.Model):
+    """Likes, comments, friend requests or messages about one target, folded into one row while unread."""
+
+    LIKE = 'like'
+    COMMENT = 'comment'
+    FRIEND_REQUEST = 'friend_request'
+    FRIEND_ACCEPTED = 'friend_accepted'
+    MESSAGE = 'message'
+
+    KINDS = (
+        (LIKE, 'Like'),
+        (COMMENT, 'Comment'),
+        (FRIEND_REQUEST, 'Friend request'),
+        (FRIEND_ACCEPTED, 'Friend request accepted'),
+        (MESSAGE, 'Message'),
+    )
+
+    VERBS = {
+        LIKE: 'liked your post',
+        COMMENT: 'commented on your post',
+        FRIEND_REQUEST: 'sent you a friend request',
+        FRIEND_ACCEPTED: 'accepted your friend request',
+        MESSAGE: 'sent you a message',
+    }
+
+    # Distinct actors remembered per row; beyond this actor_count may count someone twice
+    MAX_ACTORS = 10
+
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name='notifications', on_delete=models.CASCADE
+    )
+    kind = models.CharField(max_length=20, choices=KINDS)
+    # The post, friend request or conversation the notification is about
+    target_id = models.PositiveBigIntegerField()
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.CASCADE)
+    actor_ids = models.JSONField(default=list)
+    actor_count = models.PositiveIntegerField(default=0)
+    count = models.PositiveIntegerField(default=0)
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-updated_at', '-id']
+        indexes = [
+            models.Index(
+                fields=['recipient', '-updated_at', '-id'], name='social_notification_seek_idx'
+            ),
+        ]
+        constraints = [
+            # New events fold into the unread row for their target instead of adding one
+            models.UniqueConstraint(
+                fields=['recipient', 'kind', 'target_id'],
+                condition=Q(is_read=False),
+                name='social_notification_unread_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} for {self.recipient_id}: {self.summary}"
+
+    def add_actor(self, actor_id):
+        """Fold one more event by ``actor_id`` into this notification."""
+
+        self.count += 1
+        self.actor_id = actor_id
+        if actor_id in self.actor_ids:
+            self.actor_ids.remove(actor_id)
+        else:
+            self.actor_count += 1
+        self.actor_ids = [actor_id, *self.actor_ids][: self.MAX_ACTORS]
+
+    @property
+    def summary(self):
+        others = self.actor_count - 1
+        who = self.actor.username
+        if others > 0:
+            who += f" and {others} other{'s' if others > 1 else ''}"
+        if self.kind == self.MESSAGE and self.count > 1:
+            return f"{who} sent you {self.count} messages"
+        return f"{who} {self.VERBS[self.kind]}"
+
+    def get_absolute_url(self):
+        if self.kind in (self.LIKE, self.COMMENT):
+            return reverse('feed')
+        if self.kind == self.MESSAGE:
+            return reverse('conversation', args=[self.target_id])
+        return reverse('profile', args=[self.actor.username])
+
+
+class Task(models.Model):
+    """A unit of deferred work waiting in the database-backed queue."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+
+    STATUSES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    )
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    # Claimed tasks whose lease runs out are picked up again by another worker
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after', 'id'], name='social_task_ready_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 
 
@@ -156,3 +817,148 @@ from django.dispatch import receiver
 def create_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def purge_archived_messages(sender, instance, **kwargs):
+    """Drop a deleted user's archived group messages along with their hot ones."""
+
+    from . import archive
+
+    archive.purge_sender(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+def cache_profile(sender, instance, **kwargs):
+    """Write saved profiles through to the cache the feed sidebar reads."""
+
+    from .cache import store
+
+    store.store_profile(instance)
+
+
+@receiver(post_save, sender=FriendRequest)
+def sync_friendship(sender, instance, **kwargs):
+    """Keep friendship edges, timelines and suggestions in step with a request."""
+
+    from . import jobs, suggestions
+    from .cache import store
+    from .friends import invalidate_friend_ids
+
+    sender_user, receiver_user = instance.sender, instance.receiver
+    pair = (sender_user.pk, receiver_user.pk)
+    store.bump_versions(*[store.user_version(user_id) for user_id in pair])
+    if instance.status == FriendRequest.ACCEPTED:
+        Friendship.connect(sender_user, receiver_user)
+        invalidate_friend_ids(sender_user, receiver_user)
+        jobs.sync_timelines.delay(owner_id=pair[0], author_id=pair[1], connected=True)
+        jobs.sync_timelines.delay(owner_id=pair[1], author_id=pair[0], connected=True)
+        jobs.refresh_suggestions.delay(user_ids=pair)
+        return
+    if instance.status == FriendRequest.PENDING:
+        suggestions.forget_pair(sender_user, receiver_user)
+        return
+    if instance.status == FriendRequest.DECLINED:
+        _disconnect_unless_accepted(sender_user, receiver_user)
+
+
+@receiver(post_delete, sender=FriendRequest)
+def unfriend_on_delete(sender, instance, **kwargs):
+    """Deleting an accepted request (in the admin or by cascade) ends the friendship."""
+
+    from .cache import store
+
+    if instance.status != FriendRequest.ACCEPTED:
+        return
+    pair = (instance.sender_id, instance.receiver_id)
+    store.bump_versions(*[store.user_version(user_id) for user_id in pair])
+    _disconnect_unless_accepted(instance.sender, instance.receiver)
+
+
+def _disconnect_unless_accepted(user_a, user_b):
+    """Drop the pair's friendship unless another accepted request still joins them."""
+
+    from . import jobs
+    from .friends import invalidate_friend_ids
+
+    still_friends = FriendRequest.objects.filter(
+        Q(sender=user_a, receiver=user_b) | Q(sender=user_b, receiver=user_a),
+        status=FriendRequest.ACCEPTED,
+    ).exists()
+    if still_friends:
+        return
+    pair = (user_a.pk, user_b.pk)
+    Friendship.disconnect(user_a, user_b)
+    invalidate_friend_ids(user_a, user_b)
+    jobs.sync_timelines.delay(owner_id=pair[0], author_id=pair[1], connected=False)
+    jobs.sync_timelines.delay(owner_id=pair[1], author_id=pair[0], connected=False)
+    jobs.refresh_suggestions.delay(user_ids=pair)
+
+
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Like)
+def uncount_engagement(sender, instance, **kwargs):
+    """Take a deleted comment or like off its post's counter and retire the cached fragments."""
+
+    from .cache import store
+
+    field = 'comment_count' if sender is Comment else 'like_count'
+    Post.objects.filter(pk=instance.post_id).update(
+        **{field: Greatest(F(field) - 1, Value(0)), 'version': F('version') + 1}
+    )
+    store.invalidate_post_counters(instance.post_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_posts_version(sender, instance, **kwargs):
+    from .cache import store
+
+    store.bump_versions(store.posts_version(instance.author_id))
+    # Saves bump Post.version in the database; cached counters carry the old one
+    store.invalidate_post_counters(instance.pk)
+
+
+@receiver(post_save, sender=Message)
+def broadcast_message(sender, instance, created, **kwargs):
+    """Push new messages to connected participants once they are committed."""
+
+    if created:
+        from .realtime import publish_message
+
+        transaction.on_commit(lambda: publish_message(instance))
+
+
+# Fields whose changes make a saved row need re-indexing for search
+SEARCHABLE_FIELDS = {
+    Post: {'message', 'visibility'},
+    Comment: {'text'},
+    Message: {'body'},
+    Profile: {'bio', 'job_title', 'location'},
+}
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Message)
+@receiver(post_save, sender=Profile)
+def index_for_search(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the search index in step with searchable text and its visibility."""
+
+    if update_fields is not None and not SEARCHABLE_FIELDS[sender] & set(update_fields):
+        return
+    from . import jobs, search
+
+    jobs.index_search.delay(
+        kind=search.kind_of(instance), id=instance.pk, audience=sender is Post and not created
+    )
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Message)
+@receiver(post_delete, sender=Profile)
+def remove_from_search(sender, instance, **kwargs):
+    from . import search
+
+    search.remove_object(instance)
@@ -0,0 +1,138 @@
+"""Notifications about likes, comments, friend requests and messages.
+
+Views call :func:`notify`, which only queues the event; the task worker
+delivers queued events in bulk with :func:`deliver`. While a notification is
+unread, later events of the same kind about the same target fold into it
+("alice and 4 others liked your post") instead of adding rows, so a burst of
+likes costs one row and the list stays short.
+
+Each profile carries an ``unread_notifications`` counter of unread rows. It
+is moved with ``F()`` updates as rows are created and read, so the navbar
+badge is read from the cached profile without counting anything.
+"""
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import pagination
+from .cache import store
+from .models import Notification, Profile
+
+PAGE_SIZE = 10
+
+
+def notify(recipient_id, kind, target_id, actor_id):
+    """Queue a notification for ``recipient_id``; nobody is told about their own actions."""
+
+    if recipient_id == actor_id:
+        return
+    from . import jobs
+
+    jobs.deliver_notifications.delay(
+        recipient_id=recipient_id, kind=kind, target_id=target_id, actor_id=actor_id
+    )
+
+
+def notify_many(recipient_ids, kind, target_id, actor_id):
+    """Queue the same notification for several recipients with one insert."""
+
+    from . import jobs
+
+    jobs.deliver_notifications.delay_many(
+        {'recipient_id': recipient_id, 'kind': kind, 'target_id': target_id, 'actor_id': actor_id}
+        for recipient_id in recipient_ids
+        if recipient_id != actor_id
+    )
+
+
+def deliver(events):
+    """Write queued events, folding them into unread rows for the same target.
+
+    Costs one query to find the unread rows, one bulk insert, one bulk update
+    and one counter update per recipient with new rows.
+    """
+
+    actors = {}
+    for event in events:
+        key = (event['recipient_id'], event['kind'], event['target_id'])
+        actors.setdefault(key, []).append(event['actor_id'])
+    if not actors:
+        return
+
+    match = Q()
+    for recipient_id, kind, target_id in actors:
+        match |= Q(recipient_id=recipient_id, kind=kind, target_id=target_id)
+    unread = {
+        (notification.recipient_id, notification.kind, notification.target_id): notification
+        for notification in Notification.objects.filter(match, is_read=False)
+    }
+
+    now = timezone.now()
+    created, updated = [], []
+    new_unread = Counter()
+    for key, actor_ids in actors.items():
+        notification = unread.get(key)
+        if notification is None:
+            recipient_id, kind, target_id = key
+            notification = Notification(
+                recipient_id=recipient_id, kind=kind, target_id=target_id, created_at=now
+            )
+            created.append(notification)
+            new_unread[recipient_id] += 1
+        else:
+            updated.append(notification)
+        for actor_id in actor_ids:
+            notification.add_actor(actor_id)
+        notification.updated_at = now
+
+    with transaction.atomic():
+        Notification.objects.bulk_create(created)
+        Notification.objects.bulk_update(
+            updated, ['actor', 'actor_ids', 'actor_count', 'count', 'updated_at']
+        )
+        for recipient_id, added in new_unread.items():
+            Profile.objects.filter(user_id=recipient_id).update(
+                unread_notifications=F('unread_notifications') + added
+            )
+    store.invalidate_profile(*new_unread)
+
+
+def mark_read(user, kind=None, target_id=None):
+    """Mark ``user``'s unread notifications read, or only those about one target."""
+
+    unread = Notification.objects.filter(recipient=user, is_read=False)
+    if kind is not None:
+        unread = unread.filter(kind=kind, target_id=target_id)
+    with transaction.atomic():
+        read = unread.update(is_read=True)
+        if read:
+            # Decrement rather than zero so rows delivered meanwhile stay counted
+            Profile.objects.filter(user=user).update(
+                unread_notifications=Greatest(F('unread_notifications') - read, Value(0))
+            )
+    if read:
+        store.invalidate_profile(user.pk)
+    return read
+
+
+def unread_count(user):
+    profile = store.get_profile(user.pk)
+    return profile.unread_notifications if profile else 0
+
+
+def get_page(user, cursor=None, limit=PAGE_SIZE):
+    """Return ``(notifications, next_cursor)``, most recently updated first."""
+
+    notifications = pagination.before(
+        Notification.objects.filter(recipient=user), cursor, time_field='updated_at'
+    )
+    rows = list(notifications.select_related('actor').order_by('-updated_at', '-id')[: limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = pagination.encode_cursor(rows[-1].updated_at, rows[-1].pk)
+    return rows, next_cursor
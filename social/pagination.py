@@ -0,0 +1,79 @@
+"""Keyset (seek) pagination helpers shared by the feed and chat views.
+
+Offset pagination gets slower the deeper a user scrolls because the database
+still has to walk every skipped row. Keyset pagination instead remembers the
+sort key of the last row that was shown and asks for rows strictly after it,
+which an index on ``(created_at, id)`` answers with a short range scan.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def encode_cursor(created_at, pk):
+    """Pack a ``(created_at, id)`` sort key into an opaque URL-safe token."""
+
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Unpack a token from :func:`encode_cursor`, returning ``None`` if invalid."""
+
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        stamp, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(stamp), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def encode_score_cursor(score, pk):
+    """Pack a ``(score, id)`` sort key for feeds ordered by a float score."""
+
+    raw = f"{score!r}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_score_cursor(token):
+    """Unpack a token from :func:`encode_score_cursor`, returning ``None`` if invalid."""
+
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        score, pk = raw.rsplit('|', 1)
+        return float(score), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def before(queryset, cursor, time_field='created_at', id_field='id'):
+    """Limit a queryset to rows that sort strictly before ``cursor`` (newest first)."""
+
+    if cursor is None:
+        return queryset
+    created_at, pk = cursor
+    return queryset.filter(
+        Q(**{f'{time_field}__lt': created_at})
+        | Q(**{time_field: created_at, f'{id_field}__lt': pk})
+    )
+
+
+def after(queryset, cursor, time_field='created_at', id_field='id'):
+    """Limit a queryset to rows that sort strictly after ``cursor`` (oldest first)."""
+
+    if cursor is None:
+        return queryset
+    created_at, pk = cursor
+    return queryset.filter(
+        Q(**{f'{time_field}__gt': created_at})
+        | Q(**{time_field: created_at, f'{id_field}__gt': pk})
+    )
@@ -0,0 +1,255 @@
+"""Per-view query, timing and memory instrumentation.
+
+``ProfilingMiddleware`` measures every request and files the sample under
+the resolved URL name in a process-wide :data:`stats` registry. Each response
+carries a ``Server-Timing`` header with the measurements, so they show up in
+the browser's network panel. Template time is attributed for views that
+return a ``TemplateResponse``; peak memory is only traced when
+``SOCIAL_PROFILE_MEMORY`` is on because tracemalloc slows every allocation.
+
+Views can declare how many SQL queries they are expected to need, either
+with the :func:`query_budget` decorator or a ``query_budget`` class
+attribute. Going over budget logs a warning, or raises
+:class:`QueryBudgetExceeded` when ``SOCIAL_QUERY_BUDGET_STRICT`` is on (the
+test suite turns it on). Work a request hands off to the task queue is the
+worker's cost, so queries run inside :func:`unmetered` (as eagerly applied
+tasks are) are left out of the count.
+
+Queries are counted by :func:`measure`, an execute wrapper every connection
+gets when it opens. It reports to the sample of the request in the current
+context, which follows an ASGI request into the thread that runs its ORM
+calls; connections themselves belong to that thread, not to the request.
+"""
+
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# The sample of the request being handled, if it is being measured
+_current = ContextVar('social_profile_sample', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """A view ran more SQL queries than it declared."""
+
+
+def query_budget(limit):
+    """Declare the maximum number of SQL queries a function view may run."""
+
+    def decorator(view_func):
+        view_func.query_budget = limit
+        return view_func
+
+    return decorator
+
+
+@contextmanager
+def unmetered():
+    """Leave the queries run inside the block out of the current request's sample."""
+
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def measure(execute, sql, params, many, context):
+    """Execute wrapper that counts each query against the current request's sample."""
+
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    return sample(execute, sql, params, many, context)
+
+
+def install(sender, connection, **kwargs):
+    """``connection_created`` receiver that adds :func:`measure` to every connection."""
+
+    if measure not in connection.execute_wrappers:
+        connection.execute_wrappers.append(measure)
+
+
+def get_query_budget(view_func):
+    view_class = getattr(view_func, 'view_class', None)
+    if view_class is not None:
+        return getattr(view_class, 'query_budget', None)
+    return getattr(view_func, 'query_budget', None)
+
+
+class Sample:
+    """Measurements for a single request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.total_seconds = 0.0
+        self.peak_bytes = None
+        self.budget = None
+        self.started = None
+
+    def __call__(self, execute, sql, params, many, context):
+        # Called by measure() for the request's queries
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - start
+            self.queries += 1
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.queries > self.budget
+
+    def server_timing(self):
+        parts = [
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_seconds * 1000:.1f};desc="templates"',
+            f'total;dur={self.total_seconds * 1000:.1f}',
+        ]
+        if self.peak_bytes is not None:
+            parts.append(f'mem;desc="peak {self.peak_bytes // 1024} KiB"')
+        return ', '.join(parts)
+
+
+class ViewStats:
+    """Thread-safe aggregate of samples keyed by URL name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, name, sample):
+        with self._lock:
+            entry = self._views.setdefault(
+                name,
+                {
+                    'requests': 0,
+                    'queries': 0,
+                    'max_queries': 0,
+                    'db_ms': 0.0,
+                    'template_ms': 0.0,
+                    'total_ms': 0.0,
+                    'max_total_ms': 0.0,
+                    'peak_kib': None,
+                    'budget': sample.budget,
+                    'over_budget': 0,
+                },
+            )
+            entry['requests'] += 1
+            entry['queries'] += sample.queries
+            entry['max_queries'] = max(entry['max_queries'], sample.queries)
+            entry['db_ms'] += sample.db_seconds * 1000
+            entry['template_ms'] += sample.template_seconds * 1000
+            entry['total_ms'] += sample.total_seconds * 1000
+            entry['max_total_ms'] = max(entry['max_total_ms'], sample.total_seconds * 1000)
+            if sample.peak_bytes is not None:
+                entry['peak_kib'] = max(entry['peak_kib'] or 0, sample.peak_bytes // 1024)
+            entry['over_budget'] += int(sample.over_budget)
+
+    def snapshot(self):
+        """Return per-view totals plus per-request averages."""
+
+        with self._lock:
+            views = {name: dict(entry) for name, entry in self._views.items()}
+        for entry in views.values():
+            requests = entry['requests']
+            entry['avg_queries'] = round(entry['queries'] / requests, 2)
+            entry['avg_db_ms'] = round(entry['db_ms'] / requests, 2)
+            entry['avg_template_ms'] = round(entry['template_ms'] / requests, 2)
+            entry['avg_total_ms'] = round(entry['total_ms'] / requests, 2)
+            for key in ('db_ms', 'template_ms', 'total_ms', 'max_total_ms'):
+                entry[key] = round(entry[key], 2)
+        return views
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+stats = ViewStats()
+
+
+class ProfilingMiddleware:
+    """Record query count, DB time, template time and peak memory per view."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            # Lets ASGI requests pass through without a hop to a worker thread
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not getattr(settings, 'SOCIAL_PROFILING', True):
+            return self.get_response(request)
+        sample, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, sample, response)
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'SOCIAL_PROFILING', True):
+            return await self.get_response(request)
+        sample, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, sample, response)
+
+    def _start(self, request):
+        sample = request.profile_sample = Sample()
+        if getattr(settings, 'SOCIAL_PROFILE_MEMORY', False):
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        sample.started = time.perf_counter()
+        return sample, _current.set(sample)
+
+    def _finish(self, request, sample, response):
+        sample.total_seconds = time.perf_counter() - sample.started
+        if getattr(settings, 'SOCIAL_PROFILE_MEMORY', False):
+            sample.peak_bytes = tracemalloc.get_traced_memory()[1]
+
+        match = getattr(request, 'resolver_match', None)
+        name = match.view_name if match else 'unresolved'
+        stats.record(name, sample)
+        response['Server-Timing'] = sample.server_timing()
+
+        if sample.over_budget:
+            detail = f'{name} ran {sample.queries} queries; its budget is {sample.budget}'
+            if getattr(settings, 'SOCIAL_QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(detail)
+            logger.warning(detail)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        sample = getattr(request, 'profile_sample', None)
+        if sample is not None:
+            sample.budget = get_query_budget(view_func)
+
+    def process_template_response(self, request, response):
+        # Render here rather than in the handler so the time can be attributed
+        sample = getattr(request, 'profile_sample', None)
+        if sample is not None:
+            start = time.perf_counter()
+            response.render()
+            sample.template_seconds += time.perf_counter() - start
+        return response
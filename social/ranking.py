@@ -0,0 +1,116 @@
+"""Stored, time-decayed scores for the ranked feed.
+
+A post's score follows the Hacker News formula::
+
+    (1 + likes * LIKE_WEIGHT + comments * COMMENT_WEIGHT) / (age_hours + 2) ** gravity
+
+It is written to ``Post.score`` instead of being computed while reading,
+and each ``TimelineEntry`` stores that score multiplied by the reader's
+affinity for the author. Affinity comes from the friendship graph: friends
+start at ``FRIEND_AFFINITY`` and gain a little for every mutual friend. The
+ranked feed is then a keyset scan on ``(owner, -score)``, just like the
+chronological one on ``(owner, -created_at)``.
+
+Scores are kept up to date in two ways:
+
+* likes and comments queue :func:`rescore` for the post (see
+  ``jobs.rescore_posts``), so engagement shows up straight away, and
+* ``decay_feed_scores`` re-applies the time decay to every post in the
+  ranking window. Run it every few minutes. Between runs, untouched posts
+  keep the score from their last update.
+"""
+
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Friendship, Post, TimelineEntry
+
+LIKE_WEIGHT = 1.0
+COMMENT_WEIGHT = 2.0
+FRIEND_AFFINITY = 1.5
+MUTUAL_FRIEND_WEIGHT = 0.25
+
+
+def hot_score(like_count, comment_count, created_at, now=None):
+    now = now or timezone.now()
+    age_hours = max((now - created_at).total_seconds(), 0) / 3600
+    points = 1 + like_count * LIKE_WEIGHT + comment_count * COMMENT_WEIGHT
+    return points / (age_hours + 2) ** settings.SOCIAL_FEED_GRAVITY
+
+
+def affinity(mutual_count):
+    return FRIEND_AFFINITY + MUTUAL_FRIEND_WEIGHT * math.log1p(mutual_count)
+
+
+def affinities(author_id, reader_ids):
+    """Return ``{reader_id: affinity}`` for readers of ``author_id``'s posts.
+
+    The author's own timeline counts as a friend with no mutual friends.
+    Costs one query, or none when the author is the only reader.
+    """
+
+    readers = set(reader_ids)
+    others = readers - {author_id}
+    mutual = {}
+    if others:
+        author_friends = Friendship.objects.filter(user_id=author_id).values('friend_id')
+        # Left to itself the author would share every one of their own friends
+        mutual = dict(
+            Friendship.objects.filter(user_id__in=others, friend_id__in=author_friends)
+            .values('user_id')
+            .annotate(mutual=Count('pk'))
+            .values_list('user_id', 'mutual')
+        )
+    return {reader_id: affinity(mutual.get(reader_id, 0)) for reader_id in readers}
+
+
+def _entry_scores():
+    """Each entry's score: the reader's affinity times the post's current score."""
+
+    return F('affinity') * Subquery(Post.objects.filter(pk=OuterRef('post_id')).values('score')[:1])
+
+
+def rescore(post_ids, now=None):
+    """Recompute the scores of ``post_ids`` and of their timeline entries.
+
+    Costs three queries however many readers the posts have.
+    """
+
+    now = now or timezone.now()
+    posts = list(Post.objects.filter(pk__in=post_ids).only('created_at', 'like_count', 'comment_count'))
+    for post in posts:
+        post.score = hot_score(post.like_count, post.comment_count, post.created_at, now)
+    with transaction.atomic():
+        Post.objects.bulk_update(posts, ['score'])
+        TimelineEntry.objects.filter(post_id__in=[post.pk for post in posts]).update(
+            score=_entry_scores()
+        )
+    return len(posts)
+
+
+def decay(window_days=None, batch_size=1000, now=None):
+    """Re-apply time decay to every post in the ranking window; return how many were rescored.
+
+    Posts that have aged out of the window drop to a score of 0, so they
+    sort after everything still in it.
+    """
+
+    now = now or timezone.now()
+    if window_days is None:
+        window_days = settings.SOCIAL_FEED_RANK_WINDOW_DAYS
+    cutoff = now - timedelta(days=window_days)
+    with transaction.atomic():
+        Post.objects.filter(created_at__lt=cutoff, score__gt=0).update(score=0)
+        TimelineEntry.objects.filter(created_at__lt=cutoff, score__gt=0).update(score=0)
+
+    in_window = Post.objects.filter(created_at__gte=cutoff).order_by('pk').values_list('pk', flat=True)
+    rescored, last_pk = 0, 0
+    while batch := list(in_window.filter(pk__gt=last_pk)[:batch_size]):
+        rescored += rescore(batch, now)
+        last_pk = batch[-1]
+    return rescored
@@ -0,0 +1,159 @@
+"""Push new chat messages to connected browsers over Server-Sent Events.
+
+Views publish events to a broker channel per conversation and the streaming
+endpoint relays them to every open tab. The broker is chosen with the
+``SOCIAL_REALTIME_BROKER`` setting; :class:`InMemoryBroker` serves a single
+process (development and tests) and a shared broker such as Redis pub/sub can
+be plugged in by implementing :class:`Broker` and :class:`Subscription`.
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils.module_loading import import_string
+
+KEEPALIVE_SECONDS = 20
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class Subscription:
+    """A live feed of events from one channel, consumed inside an event loop."""
+
+    async def get(self, timeout=None):
+        """Return the next event, or ``None`` if ``timeout`` seconds pass first."""
+
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+
+class Broker:
+    """Publish/subscribe interface used by the chat views."""
+
+    def publish(self, channel, event):
+        """Deliver ``event`` (a JSON-serializable dict) to every subscriber.
+
+        Must be safe to call from synchronous code on any thread.
+        """
+
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """Return a :class:`Subscription`; called from inside the event loop."""
+
+        raise NotImplementedError
+
+
+class _QueueSubscription(Subscription):
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    async def get(self, timeout=None):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker._unregister(self)
+
+
+class InMemoryBroker(Broker):
+    """Fan events out to subscribers living in this process only."""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.queue.put_nowait, event)
+            except RuntimeError:
+                # The subscriber's event loop has shut down
+                self._unregister(subscription)
+
+    def subscribe(self, channel):
+        subscription = _QueueSubscription(self, channel)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def _unregister(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+
+def get_broker():
+    """Return the process-wide broker configured by ``SOCIAL_REALTIME_BROKER``."""
+
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.SOCIAL_REALTIME_BROKER)()
+    return _broker
+
+
+def conversation_channel(conversation_id):
+    return f'conversation:{conversation_id}'
+
+
+def render_bubble(message, viewer_id):
+    return render_to_string(
+        'social/components/message_bubble.html',
+        {'message': message, 'viewer_id': viewer_id},
+    )
+
+
+def publish_message(message):
+    """Render a new message as recipients see it and push it to its conversation."""
+
+    get_broker().publish(
+        conversation_channel(message.conversation_id),
+        {
+            'type': 'message',
+            'id': message.pk,
+            'sender_id': message.sender_id,
+            'html': render_bubble(message, viewer_id=None),
+        },
+    )
+
+
+def format_event(event, data):
+    """Encode one Server-Sent Event, prefixing every line of ``data``."""
+
+    lines = ''.join(f'data: {line}\n' for line in data.splitlines() or [''])
+    return f'event: {event}\n{lines}\n'
+
+
+async def event_stream(channel, viewer_id, keepalive=KEEPALIVE_SECONDS):
+    """Yield SSE frames for ``channel`` until the client disconnects."""
+
+    subscription = get_broker().subscribe(channel)
+    try:
+        yield ': connected\n\n'
+        while True:
+            event = await subscription.get(timeout=keepalive)
+            if event is None:
+                yield ': keepalive\n\n'
+            elif event.get('sender_id') != viewer_id:
+                # The sender's own tab already rendered the bubble from its POST
+                yield format_event(event['type'], event['html'])
+    finally:
+        subscription.close()
@@ -0,0 +1,198 @@
+"""Read receipts and typing indicators for chats.
+
+Both are high-frequency: every open thread reports what it has read and
+every few keystrokes report typing. Instead of one write or one broker
+message per event, events go into an in-process :class:`CoalescingBuffer`
+that keeps only the latest event per ``(conversation, user)`` and flushes
+the batch at most ``SOCIAL_CHAT_FLUSH_SECONDS`` after the first one arrived.
+
+* Read positions flush to ``ConversationMember.last_read_message_id`` with a
+  single UPDATE per batch, then tell the other participants over the
+  realtime broker so they can show "Seen".
+* Typing events flush to the broker only and never touch the database.
+
+A process that dies loses at most one interval of read positions; the next
+visit to the thread records them again. Set the interval to 0 (the test
+suite does) to flush every event straight away.
+"""
+
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections, transaction
+from django.utils.html import format_html
+
+from .cache import store
+from .models import ConversationMember
+from .realtime import conversation_channel, get_broker
+
+logger = logging.getLogger(__name__)
+
+MAX_PENDING = 1000
+TYPING_SALT = 'social.typing'
+# Short, so a token leaked from a page soon stops working; a thread left open
+# longer stops reporting typing until it is reloaded
+TYPING_TOKEN_MAX_AGE = 10 * 60
+
+
+def _keep_latest(old, new):
+    return new
+
+
+class CoalescingBuffer:
+    """Collect keyed events in memory and hand them to ``flush`` in batches.
+
+    An event for a key that is already pending is combined with it by
+    ``merge``. The batch is flushed ``interval`` seconds after its first
+    event (on a timer thread, so quiet periods still flush) or as soon as
+    ``max_pending`` keys are waiting, whichever comes first.
+    """
+
+    def __init__(self, flush, interval=None, max_pending=MAX_PENDING, merge=_keep_latest, name=None):
+        self._flush = flush
+        self._interval = interval
+        self.max_pending = max_pending
+        self.merge = merge
+        self.name = name or flush.__name__
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._timer = None
+        atexit.register(self.flush)
+
+    @property
+    def interval(self):
+        if self._interval is not None:
+            return self._interval
+        return settings.SOCIAL_CHAT_FLUSH_SECONDS
+
+    def add(self, key, value):
+        interval = self.interval
+        with self._lock:
+            if key in self._pending:
+                value = self.merge(self._pending[key], value)
+            self._pending[key] = value
+            full = len(self._pending) >= self.max_pending
+            if not full and interval > 0 and self._timer is None:
+                self._timer = threading.Timer(interval, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full or interval <= 0:
+            self.flush()
+
+    def flush(self):
+        """Apply everything pending now; return how many keys were flushed."""
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if pending:
+            try:
+                self._flush(pending)
+            except Exception:
+                # Receipts and typing are best effort; never fail the caller
+                logger.exception('Flushing %d %s events failed', len(pending), self.name)
+        return len(pending)
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        finally:
+            connections.close_all()
+
+    def __len__(self):
+        return len(self._pending)
+
+
+def _write_reads(pending):
+    # A savepoint, so a failed flush inside a request's transaction doesn't break it
+    with transaction.atomic():
+        ConversationMember.record_reads(pending)
+    broker = get_broker()
+    for (conversation_id, user_id), message_id in pending.items():
+        broker.publish(
+            conversation_channel(conversation_id),
+            {
+                'type': 'read',
+                'sender_id': user_id,
+                'message_id': message_id,
+                'html': format_html('<i class="bi bi-check2-all"></i> Seen'),
+            },
+        )
+
+
+def _publish_typing(pending):
+    broker = get_broker()
+    for (conversation_id, user_id), username in pending.items():
+        broker.publish(
+            conversation_channel(conversation_id),
+            {
+                'type': 'typing',
+                'sender_id': user_id,
+                'html': format_html('<span class="fb-typing">{} is typing…</span>', username),
+            },
+        )
+
+
+reads = CoalescingBuffer(_write_reads, merge=max, name='read receipt')
+typing_events = CoalescingBuffer(_publish_typing, name='typing')
+
+
+def mark_read(conversation_id, user_id, message_id):
+    """Record that ``user_id`` has seen ``conversation_id`` up to ``message_id``."""
+
+    if message_id is not None:
+        reads.add((conversation_id, user_id), message_id)
+
+
+def typing(conversation_id, user_id, username):
+    typing_events.add((conversation_id, user_id), username)
+
+
+def typing_token(conversation, user):
+    """Sign who is typing in which conversation, so reporting it needs no session or lookups."""
+
+    return signing.dumps([conversation.pk, user.pk, user.username], salt=TYPING_SALT)
+
+
+def read_typing_token(token):
+    """Return ``(conversation_id, user_id, username)`` from :func:`typing_token`, or ``None``.
+
+    A valid signature is not enough: the typist must still be a member of the
+    conversation and, in a direct chat, still be friends with the other person.
+    """
+
+    try:
+        conversation_id, user_id, username = signing.loads(
+            token, salt=TYPING_SALT, max_age=TYPING_TOKEN_MAX_AGE
+        )
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    member = (
+        ConversationMember.objects.filter(conversation_id=conversation_id, user_id=user_id)
+        .values('other_user_id')
+        .first()
+    )
+    if member is None:
+        return None
+    if member['other_user_id'] and member['other_user_id'] not in store.get_friend_ids(user_id):
+        return None
+    return conversation_id, user_id, username
+
+
+def seen_by_others(conversation_id, user_id, thread_messages):
+    """Whether another participant has read the thread's last message, if ``user_id`` sent it."""
+
+    if not thread_messages or thread_messages[-1].sender_id != user_id:
+        return False
+    return (
+        ConversationMember.objects.filter(
+            conversation_id=conversation_id, last_read_message_id__gte=thread_messages[-1].pk
+        )
+        .exclude(user_id=user_id)
+        .exists()
+    )
@@ -0,0 +1,217 @@
+"""Full-text search over posts, comments, messages and profiles.
+
+Text is split into terms by :func:`tokenize` and stored as an inverted index
+in two ordinary tables: a ``SearchDocument`` per searchable row, carrying
+the fields that decide who may see it, and a ``SearchTerm`` posting per
+distinct term. Signals in ``models.py`` keep the index in step as rows are
+saved (through the task queue) and deleted, and ``manage.py reindex_search``
+rebuilds it in bulk.
+
+Ranking happens in SQL: documents matching more of the query's terms come
+first, then documents with the higher TF-IDF score, normalised by document
+length so long posts don't win on volume alone. The tables work the same on
+SQLite and PostgreSQL. A backend-native engine such as FTS5 or ``tsvector``
+could replace :func:`search` later without changing callers.
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Q, Sum, Value
+from django.db.models.expressions import Case, When
+from django.db.models.functions import Cast
+
+from .friends import get_friend_ids
+from .models import (
+    Comment,
+    ConversationMember,
+    Message,
+    Post,
+    Profile,
+    SearchDocument,
+    SearchTerm,
+)
+
+RESULTS_PER_PAGE = 20
+MAX_QUERY_TERMS = 8
+MAX_TERM_LENGTH = 64
+STOP_WORDS = frozenset(
+    'a an and are as at be but by for from has have i in is it its of on or that the this to was were will with you'.split()
+)
+_WORD_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Return the index terms in ``text``: case-folded words minus stop words."""
+
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    return [
+        word[:MAX_TERM_LENGTH]
+        for word in _WORD_RE.findall(text)
+        if len(word) > 1 and word not in STOP_WORDS
+    ]
+
+
+def kind_of(instance):
+    for model, kind in (
+        (Post, SearchDocument.POST),
+        (Comment, SearchDocument.COMMENT),
+        (Message, SearchDocument.MESSAGE),
+        (Profile, SearchDocument.PROFILE),
+    ):
+        if isinstance(instance, model):
+            return kind
+    raise TypeError(f'{type(instance).__name__} is not searchable')
+
+
+def document_fields(instance):
+    """Return ``(text, visibility fields)`` to index for a searchable instance."""
+
+    kind = kind_of(instance)
+    if kind == SearchDocument.POST:
+        return instance.message, {
+            'is_public': instance.visibility == 'public',
+            'audience_id': instance.author_id,
+            'created_at': instance.created_at,
+        }
+    if kind == SearchDocument.COMMENT:
+        post = instance.post
+        return instance.text, {
+            'is_public': post.visibility == 'public',
+            'audience_id': post.author_id,
+            'created_at': instance.created_at,
+        }
+    if kind == SearchDocument.MESSAGE:
+        return instance.body, {
+            'conversation_id': instance.conversation_id,
+            'created_at': instance.created_at,
+        }
+    return ' '.join((instance.bio, instance.job_title, instance.location)), {'is_public': True}
+
+
+def index_object(instance, created=False):
+    """Add or refresh ``instance`` in the index.
+
+    ``created`` skips looking for an existing document, so indexing a new
+    row costs two inserts.
+    """
+
+    text, fields = document_fields(instance)
+    counts = Counter(tokenize(text))
+    kind = kind_of(instance)
+    if not counts:
+        if not created:
+            remove_object(instance)
+        return
+    fields['length'] = sum(counts.values())
+    if created:
+        document_id = SearchDocument.objects.create(kind=kind, object_id=instance.pk, **fields).pk
+    else:
+        with transaction.atomic():
+            documents = SearchDocument.objects.filter(kind=kind, object_id=instance.pk)
+            SearchTerm.objects.filter(document__in=documents).delete()
+            if documents.update(**fields):
+                document_id = documents.values_list('pk', flat=True).get()
+            else:
+                document_id = SearchDocument.objects.create(kind=kind, object_id=instance.pk, **fields).pk
+    SearchTerm.objects.bulk_create(
+        SearchTerm(document_id=document_id, term=term, frequency=frequency)
+        for term, frequency in counts.items()
+    )
+
+
+def remove_object(instance):
+    SearchDocument.objects.filter(kind=kind_of(instance), object_id=instance.pk).delete()
+
+
+def update_post_audience(post):
+    """Carry a post's visibility over to the documents of its comments."""
+
+    SearchDocument.objects.filter(
+        kind=SearchDocument.COMMENT,
+        object_id__in=Comment.objects.filter(post=post).values('pk'),
+    ).update(is_public=post.visibility == 'public')
+
+
+def visible_to(user):
+    """``Q`` filter for the documents ``user`` is allowed to find."""
+
+    return (
+        Q(is_public=True)
+        | Q(conversation__isnull=True, audience_id__in=get_friend_ids(user) | {user.pk})
+        | Q(conversation_id__in=ConversationMember.objects.filter(user=user).values('conversation_id'))
+    )
+
+
+def search(user, query, page=1, per_page=RESULTS_PER_PAGE):
+    """Return ``(results, has_next)`` for ``query`` as ``user`` is allowed to see it.
+
+    Each result is the model instance with ``search_kind`` and
+    ``search_score`` attached, best match first.
+    """
+
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return [], False
+
+    total = SearchDocument.objects.count()
+    frequencies = dict(
+        SearchTerm.objects.filter(term__in=terms)
+        .values('term')
+        .annotate(documents=Count('document_id'))
+        .values_list('term', 'documents')
+    )
+    terms = [term for term in terms if term in frequencies]
+    if not terms:
+        return [], False
+    weight = Case(
+        *[
+            When(terms__term=term, then=Value(math.log(1 + total / frequencies[term])))
+            for term in terms
+        ],
+        output_field=FloatField(),
+    )
+
+    offset = (page - 1) * per_page
+    ranked = list(
+        SearchDocument.objects.filter(visible_to(user), terms__term__in=terms)
+        .annotate(
+            matched=Count('terms__term', distinct=True),
+            score=Sum(Cast('terms__frequency', FloatField()) * weight)
+            / (Cast(F('length'), FloatField()) + Value(1.0)),
+        )
+        .order_by('-matched', '-score', '-created_at', '-id')
+        .values('kind', 'object_id', 'score')[offset : offset + per_page + 1]
+    )
+    has_next = len(ranked) > per_page
+    return _hydrate(ranked[:per_page]), has_next
+
+
+_LOADERS = {
+    SearchDocument.POST: lambda ids: Post.objects.select_related('author').in_bulk(ids),
+    SearchDocument.COMMENT: lambda ids: Comment.objects.select_related('author', 'post__author').in_bulk(ids),
+    SearchDocument.MESSAGE: lambda ids: Message.objects.select_related(
+        'sender', 'conversation__user_low', 'conversation__user_high'
+    ).in_bulk(ids),
+    SearchDocument.PROFILE: lambda ids: Profile.objects.select_related('user').in_bulk(ids),
+}
+
+
+def _hydrate(ranked):
+    """Load the ranked rows with one query per kind, keeping the ranking order."""
+
+    ids_by_kind = {}
+    for row in ranked:
+        ids_by_kind.setdefault(row['kind'], []).append(row['object_id'])
+    loaded = {kind: _LOADERS[kind](ids) for kind, ids in ids_by_kind.items()}
+    results = []
+    for row in ranked:
+        instance = loaded[row['kind']].get(row['object_id'])
+        if instance is not None:
+            instance.search_kind = row['kind']
+            instance.search_score = row['score']
+            results.append(instance)
+    return results
@@ -0,0 +1,132 @@
+"""People-you-may-know suggestions ranked by mutual friends.
+
+Mutual-friend counts are the off-diagonal entries of ``A·A``, where ``A`` is
+the adjacency matrix of the friendship graph. The graph is sparse, so each
+row of the product is computed by walking friends of friends into a
+``Counter``. That is a sparse matrix product without materialising ``A``,
+and it costs the sum of the friends' degrees rather than the number of
+users.
+
+The top candidates per user are stored in ``FriendSuggestion``:
+``compute_friend_suggestions`` rebuilds every row, and
+:func:`refresh_around` recomputes only the users whose two-hop
+neighbourhood changed when a friendship is made or broken.
+"""
+
+import heapq
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import store
+from .models import FriendRequest, FriendSuggestion, Friendship
+
+SUGGESTIONS_PER_USER = 10
+SIDEBAR_SUGGESTIONS = 5
+
+
+def _adjacency(edges):
+    graph = defaultdict(set)
+    for user_id, friend_id in edges:
+        graph[user_id].add(friend_id)
+    return graph
+
+
+def _pending_pairs(queryset):
+    """Users who already asked each other, as ``{user_id: {other_id, ...}}`` both ways."""
+
+    pairs = defaultdict(set)
+    for sender_id, receiver_id in queryset.values_list('sender_id', 'receiver_id'):
+        pairs[sender_id].add(receiver_id)
+        pairs[receiver_id].add(sender_id)
+    return pairs
+
+
+def top_candidates(user_id, graph, excluded=(), k=SUGGESTIONS_PER_USER):
+    """Return ``[(candidate_id, mutual_count), ...]`` for one row of ``A·A``."""
+
+    friends = graph.get(user_id, ())
+    mutual = Counter()
+    for friend_id in friends:
+        mutual.update(graph.get(friend_id, ()))
+    for skip in (user_id, *friends, *excluded):
+        mutual.pop(skip, None)
+    # Most mutual friends first, lowest user ID breaks ties
+    return heapq.nsmallest(k, mutual.items(), key=lambda item: (-item[1], item[0]))
+
+
+def _rows(user_ids, graph, pending, k):
+    now = timezone.now()
+    return [
+        FriendSuggestion(user_id=user_id, candidate_id=candidate_id, mutual_count=count, computed_at=now)
+        for user_id in user_ids
+        for candidate_id, count in top_candidates(user_id, graph, pending.get(user_id, ()), k)
+    ]
+
+
+def rebuild_all(k=SUGGESTIONS_PER_USER, batch_size=2000):
+    """Recompute every user's suggestions from one scan of the edge table."""
+
+    graph = _adjacency(Friendship.objects.values_list('user_id', 'friend_id').iterator(chunk_size=batch_size))
+    pending = _pending_pairs(FriendRequest.objects.filter(status=FriendRequest.PENDING))
+    rows = _rows(sorted(graph), graph, pending, k)
+    with transaction.atomic():
+        FriendSuggestion.objects.all().delete()
+        FriendSuggestion.objects.bulk_create(rows, batch_size=batch_size)
+    store.bump_versions(store.SUGGESTIONS_VERSION)
+    return len(rows)
+
+
+def refresh_around(*user_ids, k=SUGGESTIONS_PER_USER):
+    """Recompute suggestions for ``user_ids`` and their friends.
+
+    A new or removed edge ``a–b`` changes the mutual counts of ``a``, ``b``
+    and everyone adjacent to either, so that is the set refreshed. Only the
+    two-hop neighbourhood of those users is loaded.
+    """
+
+    hop_one = _adjacency(
+        Friendship.objects.filter(user_id__in=user_ids).values_list('user_id', 'friend_id')
+    )
+    affected = set(user_ids).union(*hop_one.values())
+    graph = _adjacency(Friendship.objects.filter(user_id__in=affected).values_list('user_id', 'friend_id'))
+    # Friends of friends of the affected users, needed to count their mutuals
+    graph.update(
+        _adjacency(
+            Friendship.objects.filter(user_id__in=set().union(*graph.values()) - affected).values_list(
+                'user_id', 'friend_id'
+            )
+        )
+    )
+    pending = _pending_pairs(
+        FriendRequest.objects.filter(
+            Q(sender_id__in=affected) | Q(receiver_id__in=affected), status=FriendRequest.PENDING
+        )
+    )
+    with transaction.atomic():
+        FriendSuggestion.objects.filter(user_id__in=affected).delete()
+        FriendSuggestion.objects.bulk_create(_rows(sorted(affected), graph, pending, k))
+    store.bump_versions(*[store.user_version(user_id) for user_id in affected])
+
+
+def forget_pair(user_a, user_b):
+    """Stop suggesting two users to each other once one of them sends a request."""
+
+    FriendSuggestion.objects.filter(
+        Q(user=user_a, candidate=user_b) | Q(user=user_b, candidate=user_a)
+    ).delete()
+
+
+def suggestions_for(user, limit=SIDEBAR_SUGGESTIONS):
+    """The sidebar's suggestions with their users, in one query."""
+
+    return list(FriendSuggestion.objects.filter(user=user).select_related('candidate')[:limit])
+
+
+async def asuggestions_for(user, limit=SIDEBAR_SUGGESTIONS):
+    """Async version of :func:`suggestions_for`."""
+
+    rows = FriendSuggestion.objects.filter(user=user).select_related('candidate')[:limit]
+    return [suggestion async for suggestion in rows]
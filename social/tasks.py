@@ -0,0 +1,209 @@
+"""Deferred work on a database-backed queue.
+
+Functions decorated with :func:`task` are registered by name and queued with
+``.delay(...)``. Queuing inserts a ``Task`` row in the caller's transaction,
+so work is only picked up once the change that caused it has committed, and
+is dropped with it on rollback. ``manage.py run_tasks`` claims ready rows,
+groups them by task name and applies each group on a thread pool.
+
+Tasks declared with ``batch=True`` take a *list* of payloads and are handed
+up to ``--batch-size`` queued calls at once, so a burst of posts fans out
+with one bulk insert instead of one per post. A failing batch is retried
+payload by payload, so one bad payload doesn't hold up the rest.
+
+With ``SOCIAL_TASKS_EAGER`` on (the test suite turns it on) ``.delay()`` runs
+the function straight away instead. Its queries are still the worker's, so
+they don't count against the calling view's query budget.
+"""
+
+import logging
+import os
+import socket
+import threading
+import traceback
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import profiling
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 300
+MAX_BACKOFF_SECONDS = 3600
+
+registry = {}
+
+
+class TaskFunction:
+    """A registered task; call it directly or queue it with :meth:`delay`."""
+
+    def __init__(self, func, name, batch, max_attempts):
+        self.func = func
+        self.name = name
+        self.batch = batch
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, **payload):
+        """Queue one call with JSON-serializable keyword arguments."""
+
+        if getattr(settings, 'SOCIAL_TASKS_EAGER', False):
+            with profiling.unmetered():
+                self.apply([payload])
+            return None
+        return Task.objects.create(name=self.name, payload=payload, max_attempts=self.max_attempts)
+
+    def delay_many(self, payloads):
+        """Queue one call per payload with a single insert."""
+
+        payloads = list(payloads)
+        if not payloads:
+            return []
+        if getattr(settings, 'SOCIAL_TASKS_EAGER', False):
+            with profiling.unmetered():
+                self.apply(payloads)
+            return []
+        return Task.objects.bulk_create(
+            Task(name=self.name, payload=payload, max_attempts=self.max_attempts) for payload in payloads
+        )
+
+    def apply(self, payloads):
+        if self.batch:
+            self.func(payloads)
+        else:
+            for payload in payloads:
+                self.func(**payload)
+
+
+def task(name=None, batch=False, max_attempts=3):
+    """Register a function as a queueable task.
+
+    Batch tasks receive a list of payload dicts; plain tasks receive one
+    payload's items as keyword arguments.
+    """
+
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        registry[task_name] = TaskFunction(func, task_name, batch, max_attempts)
+        return registry[task_name]
+
+    return decorator
+
+
+def _load_task_modules():
+    # Task functions register themselves when their module is imported
+    from . import jobs  # noqa: F401
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def claim(limit, worker=None, lease=LEASE_SECONDS):
+    """Lock up to ``limit`` ready tasks for ``worker`` and return them.
+
+    Claiming is a conditional UPDATE, so concurrent workers (threads or
+    processes, on SQLite or PostgreSQL) never run the same task twice while
+    its lease holds. Running tasks whose lease expired are reclaimed.
+
+    Every claim counts as an attempt, so a task that keeps killing its worker
+    before it can record a failure is marked failed once it runs out of
+    attempts instead of being reclaimed forever.
+    """
+
+    worker = worker or worker_id()
+    now = timezone.now()
+    expired = Q(status=Task.RUNNING, locked_until__lt=now)
+    Task.objects.filter(expired, attempts__gte=F('max_attempts')).update(
+        status=Task.FAILED, locked_by='', locked_until=None, last_error='Lease expired on the last attempt'
+    )
+    ready = Q(status=Task.QUEUED, run_after__lte=now) | expired
+    candidates = list(Task.objects.filter(ready).order_by('run_after', 'id').values_list('id', flat=True)[:limit])
+    if not candidates:
+        return []
+    Task.objects.filter(ready, id__in=candidates).update(
+        status=Task.RUNNING,
+        locked_by=worker,
+        locked_until=now + timedelta(seconds=lease),
+        attempts=F('attempts') + 1,
+    )
+    return list(Task.objects.filter(id__in=candidates, status=Task.RUNNING, locked_by=worker).order_by('id'))
+
+
+def _record_failure(tasks, error):
+    now = timezone.now()
+    for queued in tasks:
+        # claim() already counted this attempt
+        queued.last_error = error
+        queued.locked_by = ''
+        queued.locked_until = None
+        if queued.attempts >= queued.max_attempts:
+            queued.status = Task.FAILED
+        else:
+            queued.status = Task.QUEUED
+            backoff = min(2 ** queued.attempts * 5, MAX_BACKOFF_SECONDS)
+            queued.run_after = now + timedelta(seconds=backoff)
+    Task.objects.bulk_update(tasks, ['last_error', 'locked_by', 'locked_until', 'status', 'run_after'])
+
+
+def _apply(func, tasks):
+    with transaction.atomic():
+        func.apply([queued.payload for queued in tasks])
+        Task.objects.filter(id__in=[queued.id for queued in tasks]).delete()
+
+
+def run_group(name, tasks):
+    """Apply a group of claimed tasks with the same name; return how many succeeded."""
+
+    func = registry.get(name)
+    if func is None:
+        _record_failure(tasks, f'No task registered as {name!r}')
+        return 0
+    try:
+        _apply(func, tasks)
+        return len(tasks)
+    except Exception:
+        if len(tasks) == 1:
+            logger.exception('Task %s #%s failed', name, tasks[0].id)
+            _record_failure(tasks, traceback.format_exc())
+            return 0
+    # Find the payloads that fail by retrying the batch one task at a time
+    return sum(run_group(name, [queued]) for queued in tasks)
+
+
+def _run_in_thread(item):
+    try:
+        return run_group(*item)
+    finally:
+        # Pool threads are short-lived; don't leave their connections open
+        connections.close_all()
+
+
+def run_pending(limit=100, batch_size=100, threads=1, worker=None):
+    """Claim and run up to ``limit`` ready tasks; return ``(succeeded, claimed)``."""
+
+    _load_task_modules()
+    tasks = claim(limit, worker)
+    groups = defaultdict(list)
+    for queued in tasks:
+        groups[queued.name].append(queued)
+    chunks = [
+        (name, group[start : start + batch_size])
+        for name, group in groups.items()
+        for start in range(0, len(group), batch_size)
+    ]
+    if threads <= 1:
+        succeeded = sum(run_group(name, chunk) for name, chunk in chunks)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            succeeded = sum(pool.map(_run_in_thread, chunks))
+    return succeeded, len(tasks)
@@ -2,6 +2,7 @@
 
 from django import template
 
+from social import avatars
 
 register = template.Library()
 
@@ -22,3 +23,28 @@ def liked_by(post, user):
     if likes is not None:
         return likes.filter(user=user).exists()
     return False
+
+
+@register.simple_tag
+def avatar_url(profile, size="sm"):
+    """Return the URL of ``profile``'s avatar at ``size``, or ``''`` without one."""
+
+    return profile.avatar_src(size) if profile else ""
+
+
+@register.inclusion_tag("social/components/avatar.html")
+def avatar(person, css_class="", profile=None):
+    """Render ``person``'s small avatar, or their initial when they have none.
+
+    Reads ``person.profile``, so the query that loaded ``person`` should
+    ``select_related`` it. Pass ``profile`` when it is already at hand.
+    """
+
+    if profile is None:
+        profile = getattr(person, "profile", None)
+    return {
+        "person": person,
+        "src": avatar_url(profile),
+        "edge": avatars.SIZES["sm"] // 2,
+        "css_class": css_class,
+    }
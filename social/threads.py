@@ -0,0 +1,83 @@
+"""Read path for chat threads.
+
+A thread opens on its latest messages and loads history on demand, in both
+directions, with ``(created_at, id)`` keyset cursors that the
+``(conversation, created_at, id)`` index on ``Message`` answers as range scans.
+Every helper returns messages oldest first, ready to render.
+
+Conversations with archived history fall through to ``social.archive`` when
+the hot rows run out, so scrolling back reads the compressed segments
+without the view noticing. Threads with nothing archived never query them.
+"""
+
+from asgiref.sync import sync_to_async
+
+from . import archive, pagination
+from .models import Message
+
+THREAD_PAGE_SIZE = 30
+
+
+def _cursor_for(message):
+    return pagination.encode_cursor(message.created_at, message.pk)
+
+
+def _thread(conversation):
+    return Message.objects.filter(conversation=conversation).select_related('sender')
+
+
+def latest_messages(conversation, limit=THREAD_PAGE_SIZE):
+    """Return ``(messages, older_cursor)`` for the newest page of a thread."""
+
+    return messages_before(conversation, None, limit)
+
+
+def _newest_first(conversation, cursor, limit):
+    return pagination.before(_thread(conversation), cursor).order_by('-created_at', '-id')[: limit + 1]
+
+
+def _with_archived_before(conversation, cursor, newest_first, limit):
+    """Merge in archived messages once a page of hot rows reaches the archived range."""
+
+    archived_until = conversation.archived_until
+    if archived_until is None:
+        return newest_first
+    if len(newest_first) > limit and newest_first[-1].created_at > archived_until:
+        return newest_first
+    archived = archive.messages_before(conversation, cursor, limit + 1)
+    return sorted(newest_first + archived, key=archive.sort_key, reverse=True)[: limit + 1]
+
+
+def _page_before(newest_first, limit):
+    older_cursor = _cursor_for(newest_first[limit - 1]) if len(newest_first) > limit else None
+    return newest_first[:limit][::-1], older_cursor
+
+
+def messages_before(conversation, cursor, limit=THREAD_PAGE_SIZE):
+    """Return ``(messages, older_cursor)`` for the page just before ``cursor``."""
+
+    newest_first = list(_newest_first(conversation, cursor, limit))
+    return _page_before(_with_archived_before(conversation, cursor, newest_first, limit), limit)
+
+
+async def alatest_messages(conversation, limit=THREAD_PAGE_SIZE):
+    """Async version of :func:`latest_messages`."""
+
+    newest_first = [message async for message in _newest_first(conversation, None, limit)]
+    newest_first = await sync_to_async(_with_archived_before)(conversation, None, newest_first, limit)
+    return _page_before(newest_first, limit)
+
+
+def messages_since(conversation, cursor, limit=THREAD_PAGE_SIZE):
+    """Return ``(messages, newer_cursor)`` for messages after ``cursor``.
+
+    ``newer_cursor`` points at the last message returned, or echoes ``cursor``
+    back when nothing new has arrived, so clients can keep polling with it.
+    """
+
+    messages = list(pagination.after(_thread(conversation), cursor).order_by('created_at', 'id')[:limit])
+    if conversation.archived_until is not None and cursor[0] <= conversation.archived_until:
+        archived = archive.messages_after(conversation, cursor, limit)
+        messages = sorted(messages + archived, key=archive.sort_key)[:limit]
+    newer_cursor = _cursor_for(messages[-1]) if messages else pagination.encode_cursor(*cursor)
+    return messages, newer_cursor
@@ -1,29 +1,70 @@
-from django.urls import path
+from django.conf import settings
+from django.urls import path, re_path
 
+from . import avatars
 from .views import (
+    ChatHistoryView,
     ChatListView,
     ChatThreadView,
     FeedView,
     ProfileView,
     SignUpView,
     add_comment,
+    add_group_member,
+    avatar,
+    chat_stream,
+    chat_typing,
+    create_group,
     create_post,
+    export_data,
+    feed_more,
+    mark_notifications_read,
+    notification_list,
+    remove_group_member,
     respond_friend_request,
+    search_results,
     send_friend_request,
     toggle_like,
     update_profile,
 )
 
+if settings.SOCIAL_ASYNC_VIEWS:
+    from .async_views import ChatListView, ChatThreadView, FeedView  # noqa: F811
+
 urlpatterns = [
     path('signup/', SignUpView.as_view(), name='signup'),
     path('feed/', FeedView.as_view(), name='feed'),
+    path('feed/more/', feed_more, name='feed_more'),
     path('posts/<int:pk>/like/', toggle_like, name='toggle_like'),
     path('posts/<int:pk>/comment/', add_comment, name='add_comment'),
     path('posts/create/', create_post, name='create_post'),
-    path('profile/<str:username>/', ProfileView.as_view(), name='profile'),
     path('profile/update/', update_profile, name='update_profile'),
+    path('profile/<str:username>/', ProfileView.as_view(), name='profile'),
     path('profile/<str:username>/friend/', send_friend_request, name='send_friend_request'),
     path('friend-request/<int:pk>/<str:decision>/', respond_friend_request, name='respond_friend_request'),
+    path('notifications/', notification_list, name='notifications'),
+    path('notifications/read/', mark_notifications_read, name='mark_notifications_read'),
+    path('search/', search_results, name='search'),
+    path('export/', export_data, name='export_data'),
+    re_path(
+        rf"^avatars/(?P<size>{'|'.join(avatars.SIZES)})/(?P<digest>[0-9a-f]{{64}})\.webp$",
+        avatar,
+        name='avatar',
+    ),
     path('chat/', ChatListView.as_view(), name='chat_list'),
+    path('chat/groups/new/', create_group, name='create_group'),
+    path('chat/c/<int:pk>/', ChatThreadView.as_view(), name='conversation'),
+    path('chat/c/<int:pk>/stream/', chat_stream, name='conversation_stream'),
+    path('chat/c/<int:pk>/typing/', chat_typing, name='conversation_typing'),
+    path('chat/c/<int:pk>/older/', ChatHistoryView.as_view(direction='older'), name='conversation_older'),
+    path('chat/c/<int:pk>/since/', ChatHistoryView.as_view(direction='since'), name='conversation_since'),
+    path('chat/c/<int:pk>/members/add/', add_group_member, name='add_group_member'),
+    path(
+        'chat/c/<int:pk>/members/<int:user_id>/remove/', remove_group_member, name='remove_group_member'
+    ),
     path('chat/<str:username>/', ChatThreadView.as_view(), name='chat_thread'),
+    path('chat/<str:username>/stream/', chat_stream, name='chat_stream'),
+    path('chat/<str:username>/typing/', chat_typing, name='chat_typing'),
+    path('chat/<str:username>/older/', ChatHistoryView.as_view(direction='older'), name='chat_older'),
+    path('chat/<str:username>/since/', ChatHistoryView.as_view(direction='since'), name='chat_since'),
 ]
@@ -1,33 +1,56 @@
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth import get_user_model, login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
-from django.http import HttpResponseForbidden
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import F, Q, prefetch_related_objects
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.template.response import TemplateResponse
+from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.generic import DetailView, ListView
 
-from .forms import CommentForm, MessageForm, PostForm, ProfileForm, SignUpForm
-from .models import Conversation, FriendRequest, Like, Message, Post, Profile
-
-
-def get_friend_ids(user):
-    """Return a set of user IDs the given user is friends with."""
-
-    sent = FriendRequest.objects.filter(
-        sender=user, status=FriendRequest.ACCEPTED
-    ).values_list('receiver', flat=True)
-    received = FriendRequest.objects.filter(
-        receiver=user, status=FriendRequest.ACCEPTED
-    ).values_list('sender', flat=True)
-    return set(sent).union(received)
-
-
-def is_friend(user, other_user):
-    """Check if two users have an accepted friendship connection."""
-
-    return other_user.id in get_friend_ids(user)
+from . import (
+    avatars,
+    export,
+    jobs,
+    notifications,
+    pagination,
+    realtime,
+    receipts,
+    search,
+    suggestions,
+    threads,
+)
+from .cache import store
+from .conditional import conditional, feed_etag, profile_etag, thread_etag
+from .db import replica_reads
+from .feed import decode_feed_cursor, get_feed_page, prepare_page
+from .forms import CommentForm, GroupForm, MessageForm, PostForm, ProfileForm, SignUpForm
+from .friends import get_friend_ids, is_friend
+from .models import (
+    Conversation,
+    ConversationMember,
+    FriendRequest,
+    Like,
+    Message,
+    Notification,
+    Post,
+    Profile,
+    TimelineEntry,
+)
+from .profiling import query_budget
 
 
 class SignUpView(View):
@@ -50,28 +73,56 @@ class FeedView(LoginRequiredMixin, ListView):
     model = Post
     template_name = 'social/feed.html'
     context_object_name = 'posts'
+    query_budget = 14
+    replica_reads = True
+
+    @method_decorator(conditional(feed_etag))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
-        friends = get_friend_ids(self.request.user)
-        return (
-            Post.objects.filter(
-                Q(visibility='public') | Q(visibility='friends', author_id__in=friends)
-            )
-            .select_related('author')
-            .prefetch_related('comments__author', 'likes')
-        )
+        posts, self.next_cursor = get_feed_page(self.request.user, ranked=self.ranked)
+        return prepare_page(posts, self.request.user)
+
+    @property
+    def ranked(self):
+        return self.request.GET.get('mode') == 'ranked'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['next_cursor'] = self.next_cursor
+        context['ranked'] = self.ranked
+        context['profile'] = store.get_profile(self.request.user.pk)
+        context['suggestions'] = suggestions.suggestions_for(self.request.user)
         context['post_form'] = PostForm()
         context['comment_form'] = CommentForm()
         context['friend_requests'] = FriendRequest.objects.filter(
             receiver=self.request.user, status=FriendRequest.PENDING
-        )
+        ).select_related('sender__profile')
         return context
 
 
 @login_required
+@query_budget(12)
+@replica_reads
+@conditional(feed_etag)
+def feed_more(request):
+    """HTMX endpoint that renders the next page of the feed after a cursor."""
+
+    ranked = request.GET.get('mode') == 'ranked'
+    cursor = decode_feed_cursor(request.GET.get('cursor'), ranked)
+    if cursor is None:
+        return redirect('feed')
+    posts, next_cursor = get_feed_page(request.user, cursor=cursor, ranked=ranked)
+    return render(
+        request,
+        'social/components/feed_page.html',
+        {'posts': prepare_page(posts, request.user), 'next_cursor': next_cursor, 'ranked': ranked},
+    )
+
+
+@login_required
+@query_budget(8)
 def create_post(request):
     if request.method != 'POST':
         return HttpResponseForbidden()
@@ -80,16 +131,34 @@ def create_post(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        # The author sees the post straight away; friends get it from the queue
+        TimelineEntry.fan_out(post, [request.user.id])
+        jobs.fan_out_posts.delay(post_id=post.pk)
         messages.success(request, 'Post shared successfully!')
     return redirect('feed')
 
 
 @login_required
+@query_budget(13)
 def toggle_like(request, pk):
     post = get_object_or_404(Post, pk=pk)
-    like, created = Like.objects.get_or_create(user=request.user, post=post)
-    if not created:
-        like.delete()
+    with transaction.atomic():
+        like, created = Like.objects.get_or_create(user=request.user, post=post)
+        if created:
+            changed = True
+            Post.objects.filter(pk=post.pk).update(
+                like_count=F('like_count') + 1, version=F('version') + 1
+            )
+        else:
+            # Only the request that actually removed the row decrements, in
+            # the Like post_delete receiver
+            changed = Like.objects.filter(pk=like.pk).delete()[0] > 0
+    store.refresh_post_counters(post)
+    if changed:
+        jobs.rescore_posts.delay(post_id=post.pk)
+    if created:
+        notifications.notify(post.author_id, Notification.LIKE, post.pk, request.user.pk)
+    post.is_liked = created
     if request.htmx:
         return render(
             request,
@@ -100,6 +169,7 @@ def toggle_like(request, pk):
 
 
 @login_required
+@query_budget(11)
 def add_comment(request, pk):
     post = get_object_or_404(Post, pk=pk)
     if request.method != 'POST':
@@ -109,8 +179,16 @@ def add_comment(request, pk):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
+            Post.objects.filter(pk=post.pk).update(
+                comment_count=F('comment_count') + 1, version=F('version') + 1
+            )
+        store.refresh_post_counters(post)
+        jobs.rescore_posts.delay(post_id=post.pk)
+        notifications.notify(post.author_id, Notification.COMMENT, post.pk, request.user.pk)
     if request.htmx:
+        prefetch_related_objects([post], 'comments__author')
         return render(request, 'social/components/comments.html', {'post': post})
     return redirect('feed')
 
@@ -118,39 +196,68 @@ def add_comment(request, pk):
 class ProfileView(LoginRequiredMixin, DetailView):
     model = Profile
     template_name = 'social/profile.html'
+    query_budget = 12
+    replica_reads = True
     slug_field = 'user__username'
     slug_url_kwarg = 'username'
 
+    @method_decorator(conditional(profile_etag))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_object(self):
-        return get_object_or_404(Profile, user__username=self.kwargs['username'])
+        return get_object_or_404(Profile.objects.select_related('user'), user__username=self.kwargs['username'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['posts'] = Post.objects.filter(author=self.object.user)
+        context['posts'] = Post.objects.filter(author=self.object.user).select_related('author')
         context['profile_form'] = ProfileForm(instance=self.object)
-        friend_ids = get_friend_ids(self.request.user)
-        context['is_friend'] = self.object.user.id in friend_ids
-        context['has_pending_request'] = FriendRequest.objects.filter(
-            sender=self.request.user,
-            receiver=self.object.user,
-            status=FriendRequest.PENDING,
-        ).exists()
-        context['incoming_request'] = FriendRequest.objects.filter(
-            sender=self.object.user,
-            receiver=self.request.user,
-            status=FriendRequest.PENDING,
-        ).exists()
+        context['is_friend'] = is_friend(self.request.user, self.object.user)
+        if self.object.user == self.request.user:
+            context['suggestions'] = suggestions.suggestions_for(self.request.user)
+        # Pending requests either way round, in one query
+        senders = set(
+            FriendRequest.objects.filter(
+                Q(sender=self.request.user, receiver=self.object.user)
+                | Q(sender=self.object.user, receiver=self.request.user),
+                status=FriendRequest.PENDING,
+            ).values_list('sender_id', flat=True)
+        )
+        context['has_pending_request'] = self.request.user.pk in senders
+        context['incoming_request'] = self.object.user_id in senders
         return context
 
 
+@login_required
+@query_budget(10)
+@replica_reads
+def search_results(request):
+    """Ranked search across everything the viewer is allowed to see."""
+
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    results, has_next = search.search(request.user, query, page=page) if query else ([], False)
+    return render(
+        request,
+        'social/search.html',
+        {'query': query, 'results': results, 'page': page, 'has_next': has_next},
+    )
+
+
 @login_required
 def update_profile(request):
     profile = request.user.profile
     if request.method == 'POST':
-        form = ProfileForm(request.POST, instance=profile)
+        form = ProfileForm(request.POST, request.FILES, instance=profile)
         if form.is_valid():
             form.save()
             messages.success(request, 'Profile updated!')
+        else:
+            for errors in form.errors.values():
+                messages.error(request, errors[0])
     return redirect('profile', username=request.user.username)
 
 
@@ -170,6 +277,9 @@ def send_friend_request(request, username):
         sender=request.user, receiver=receiver
     )
     if created:
+        notifications.notify(
+            receiver.pk, Notification.FRIEND_REQUEST, pending_request.pk, request.user.pk
+        )
         messages.info(request, 'Friend request sent.')
     elif pending_request.status == FriendRequest.PENDING:
         messages.info(request, 'Friend request already sent.')
@@ -183,37 +293,80 @@ def respond_friend_request(request, pk, decision):
     friend_request = get_object_or_404(FriendRequest, pk=pk, receiver=request.user)
     if decision == 'accept':
         friend_request.accept()
+        notifications.notify(
+            friend_request.sender_id, Notification.FRIEND_ACCEPTED, friend_request.pk, request.user.pk
+        )
         messages.success(request, 'Friend request accepted.')
     else:
         friend_request.decline()
         messages.info(request, 'Friend request declined.')
+    notifications.mark_read(request.user, Notification.FRIEND_REQUEST, friend_request.pk)
     return redirect('feed')
 
 
+@login_required
+@query_budget(6)
+def notification_list(request):
+    """Newest notifications; HTMX gets the navbar dropdown or the page after ``cursor``."""
+
+    cursor = pagination.decode_cursor(request.GET.get('cursor'))
+    items, next_cursor = notifications.get_page(request.user, cursor=cursor)
+    context = {'notification_list': items, 'next_cursor': next_cursor}
+    if cursor is not None:
+        return render(request, 'social/components/notification_page.html', context)
+    if request.htmx:
+        return render(request, 'social/components/notification_menu.html', context)
+    return render(request, 'social/notifications.html', context)
+
+
+@login_required
+def mark_notifications_read(request):
+    if request.method != 'POST':
+        return HttpResponseForbidden()
+    notifications.mark_read(request.user)
+    if request.htmx:
+        items, next_cursor = notifications.get_page(request.user)
+        return render(
+            request,
+            'social/components/notification_menu.html',
+            {'notification_list': items, 'next_cursor': next_cursor},
+        )
+    return redirect('notifications')
+
+
 class ChatListView(LoginRequiredMixin, ListView):
-    model = Conversation
+    model = ConversationMember
     template_name = 'social/chat_list.html'
-    context_object_name = 'conversations'
+    context_object_name = 'threads'
+    paginate_by = 20
+    query_budget = 8
+    replica_reads = True
 
     def get_queryset(self):
         return (
-            Conversation.objects.filter(participants=self.request.user)
-            .prefetch_related('participants', 'messages__sender')
-            .order_by('-created_at')
+            ConversationMember.objects.filter(user=self.request.user)
+            .select_related('other_user__profile', 'conversation')
+            .order_by('-last_activity_at', '-id')
         )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         friends = get_friend_ids(self.request.user)
-        context['friends'] = get_user_model().objects.filter(id__in=friends)
+        context['friends'] = get_user_model().objects.filter(id__in=friends).select_related('profile')
+        context['group_form'] = GroupForm()
         return context
 
 
 class ChatThreadView(LoginRequiredMixin, View):
+    """A chat, addressed by the friend's username (direct) or by conversation id (any kind)."""
+
     template_name = 'social/chat_thread.html'
+    # Leaves room for creating the conversation on the first message, clearing
+    # message notifications and reading a page that reaches archived history
+    query_budget = 19
 
     def get_target_user(self, username):
-        return get_object_or_404(get_user_model(), username=username)
+        return get_object_or_404(get_user_model().objects.select_related('profile'), username=username)
 
     def _validate_chat_partner(self, request, username):
         """Make sure a chat can start and return the other user or a redirect."""
@@ -227,47 +380,304 @@ class ChatThreadView(LoginRequiredMixin, View):
             return None, redirect('profile', username=target_user.username)
         return target_user, None
 
-    def get(self, request, username):
-        target_user, redirect_response = self._validate_chat_partner(request, username)
+    def get_conversation(self, request, username=None, pk=None):
+        """Return ``(conversation, other_user, redirect)`` for either kind of chat URL.
+
+        Conversations addressed by id are found through the viewer's own
+        membership row, so outsiders get a 404 from one indexed lookup.
+        ``other_user`` is ``None`` for groups.
+        """
+
+        if pk is None:
+            target_user, redirect_response = self._validate_chat_partner(request, username)
+            if redirect_response:
+                return None, None, redirect_response
+            conversation, _ = Conversation.between(request.user, target_user)
+            return conversation, target_user, None
+
+        member = get_object_or_404(
+            ConversationMember.objects.select_related('conversation', 'other_user__profile'),
+            conversation_id=pk,
+            user=request.user,
+        )
+        other_user = member.other_user
+        if other_user is not None and not is_friend(request.user, other_user):
+            messages.error(request, 'You can only chat with accepted connections.')
+            return None, None, redirect('profile', username=other_user.username)
+        return member.conversation, other_user, None
+
+    @method_decorator(conditional(thread_etag))
+    def get(self, request, username=None, pk=None):
+        conversation, other_user, redirect_response = self.get_conversation(request, username, pk)
         if redirect_response:
             return redirect_response
 
-        conversation, _ = Conversation.between(request.user, target_user)
-        messages_qs = conversation.messages.select_related('sender')
-        return render(
-            request,
-            self.template_name,
-            {
-                'conversation': conversation,
-                'messages': messages_qs,
-                'form': MessageForm(),
-                'other_user': target_user,
-            },
-        )
+        notifications.mark_read(request.user, Notification.MESSAGE, conversation.pk)
+        return self.render_thread(request, conversation, other_user, MessageForm())
 
-    def post(self, request, username):
-        target_user, redirect_response = self._validate_chat_partner(request, username)
+    def post(self, request, username=None, pk=None):
+        conversation, other_user, redirect_response = self.get_conversation(request, username, pk)
         if redirect_response:
             return redirect_response
 
-        conversation, _ = Conversation.between(request.user, target_user)
         form = MessageForm(request.POST)
         if form.is_valid():
-            Message.objects.create(
+            message = Message.objects.create(
                 conversation=conversation,
                 sender=request.user,
                 body=form.cleaned_data['body'],
             )
+            if conversation.is_group:
+                notifications.notify_many(
+                    conversation.member_ids(), Notification.MESSAGE, conversation.pk, request.user.pk
+                )
+            else:
+                notifications.notify(other_user.pk, Notification.MESSAGE, conversation.pk, request.user.pk)
+            if request.htmx:
+                # Clear the stale "Seen" under the previous message as well
+                receipt = render_to_string('social/components/read_receipt.html', {'oob': True})
+                return HttpResponse(realtime.render_bubble(message, viewer_id=request.user.pk) + receipt)
             messages.success(request, 'Message sent.')
-            return redirect('chat_thread', username=target_user.username)
-        messages_qs = conversation.messages.select_related('sender')
-        return render(
+            if conversation.is_group:
+                return redirect('conversation', pk=conversation.pk)
+            return redirect('chat_thread', username=other_user.username)
+        return self.render_thread(request, conversation, other_user, form)
+
+    def render_thread(self, request, conversation, other_user, form):
+        thread_messages, older_cursor = threads.latest_messages(conversation)
+        if thread_messages:
+            receipts.mark_read(conversation.pk, request.user.pk, thread_messages[-1].pk)
+        seen = receipts.seen_by_others(conversation.pk, request.user.pk, thread_messages)
+        members = self.group_members(conversation)
+        return self.thread_response(
+            request, conversation, other_user, form, thread_messages, older_cursor, seen, members
+        )
+
+    def group_members(self, conversation):
+        if not conversation.is_group:
+            return None
+        return list(
+            ConversationMember.objects.filter(conversation=conversation)
+            .select_related('user__profile')
+            .order_by('joined_at', 'id')
+        )
+
+    def thread_response(
+        self,
+        request,
+        conversation,
+        other_user,
+        form,
+        thread_messages,
+        older_cursor,
+        seen=False,
+        members=None,
+    ):
+        viewer = next((member for member in members or () if member.user_id == request.user.pk), None)
+        return TemplateResponse(
             request,
             self.template_name,
             {
                 'conversation': conversation,
-                'messages': messages_qs,
+                'thread_messages': thread_messages,
+                'older_cursor': older_cursor,
                 'form': form,
-                'other_user': target_user,
+                'other_user': other_user,
+                'seen': seen,
+                'members': members,
+                'can_manage': viewer is not None and viewer.can_manage,
+                'typing_token': receipts.typing_token(conversation, request.user),
             },
         )
+
+
+class ChatHistoryView(ChatThreadView):
+    """HTMX fragments of a thread either before or after a keyset cursor."""
+
+    http_method_names = ['get']
+    direction = 'older'
+
+    @method_decorator(conditional(thread_etag))
+    def get(self, request, username=None, pk=None):
+        param = 'before' if self.direction == 'older' else 'after'
+        cursor = pagination.decode_cursor(request.GET.get(param))
+        if cursor is None:
+            return HttpResponseBadRequest(f'A valid "{param}" cursor is required.')
+        conversation, _, redirect_response = self.get_conversation(request, username, pk)
+        if redirect_response:
+            return redirect_response
+
+        context = {'conversation': conversation}
+        if self.direction == 'older':
+            context['thread_messages'], context['older_cursor'] = threads.messages_before(
+                conversation, cursor
+            )
+            return render(request, 'social/components/message_page.html', context)
+        context['thread_messages'], newer_cursor = threads.messages_since(conversation, cursor)
+        if context['thread_messages']:
+            receipts.mark_read(conversation.pk, request.user.pk, context['thread_messages'][-1].pk)
+        response = render(request, 'social/components/message_page.html', context)
+        response['X-Next-Cursor'] = newer_cursor
+        return response
+
+
+@login_required
+def export_data(request):
+    """Download the viewer's posts, comments, likes, friend requests and messages.
+
+    ``?format=`` picks ndjson (default), csv (with ``?section=``) or zip.
+    """
+
+    format = request.GET.get('format', 'ndjson')
+    section = request.GET.get('section') or None
+    try:
+        chunks = export.stream(request.user, format, section)
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    if isinstance(request, ASGIRequest):
+        chunks = export.aiter_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type=export.CONTENT_TYPES[format])
+    response['Content-Disposition'] = (
+        f'attachment; filename="{export.filename(request.user, format, section)}"'
+    )
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+
+def avatar(request, size, digest):
+    """Serve a square avatar variant, making it on the first request for it."""
+
+    try:
+        path = avatars.variant(digest, size)
+    except FileNotFoundError:
+        raise Http404('No such avatar.')
+    response = FileResponse(path.open('rb'), content_type=avatars.CONTENT_TYPE)
+    response['Cache-Control'] = avatars.CACHE_CONTROL
+    return response
+
+
+@login_required
+def create_group(request):
+    if request.method != 'POST':
+        return HttpResponseForbidden()
+    form = GroupForm(request.POST, friend_ids=get_friend_ids(request.user))
+    if not form.is_valid():
+        for errors in form.errors.values():
+            messages.error(request, errors[0])
+        return redirect('chat_list')
+    conversation = Conversation.create_group(
+        request.user, form.cleaned_data['title'], form.cleaned_data['members']
+    )
+    messages.success(request, f'Created {conversation.title}.')
+    return redirect('conversation', pk=conversation.pk)
+
+
+@login_required
+def add_group_member(request, pk):
+    """Let an owner or admin add one of their friends to a group."""
+
+    if request.method != 'POST':
+        return HttpResponseForbidden()
+    member = get_object_or_404(
+        ConversationMember.objects.select_related('conversation'),
+        conversation_id=pk,
+        user=request.user,
+        conversation__kind=Conversation.GROUP,
+    )
+    if not member.can_manage:
+        return HttpResponseForbidden()
+    conversation = member.conversation
+    new_member = get_user_model().objects.filter(username=request.POST.get('username', '')).first()
+    if new_member is None or not is_friend(request.user, new_member):
+        messages.error(request, 'You can only add your friends to a group.')
+    elif ConversationMember.objects.filter(conversation=conversation).count() >= Conversation.MAX_GROUP_MEMBERS:
+        messages.error(request, f'Groups can have at most {Conversation.MAX_GROUP_MEMBERS} members.')
+    elif conversation.add_member(new_member):
+        messages.success(request, f'Added {new_member.username}.')
+    else:
+        messages.info(request, f'{new_member.username} is already in the group.')
+    return redirect('conversation', pk=pk)
+
+
+@login_required
+def remove_group_member(request, pk, user_id):
+    """Remove someone from a group: owners and admins remove others, anyone may leave."""
+
+    if request.method != 'POST':
+        return HttpResponseForbidden()
+    member = get_object_or_404(
+        ConversationMember.objects.select_related('conversation'),
+        conversation_id=pk,
+        user=request.user,
+        conversation__kind=Conversation.GROUP,
+    )
+    conversation = member.conversation
+    if user_id == request.user.pk:
+        conversation.remove_member(request.user)
+        messages.info(request, f'You left {conversation.title}.')
+        return redirect('chat_list')
+
+    target = get_object_or_404(
+        ConversationMember.objects.select_related('user'), conversation=conversation, user_id=user_id
+    )
+    if not member.can_manage or target.role == ConversationMember.OWNER:
+        return HttpResponseForbidden()
+    conversation.remove_member(target.user)
+    messages.info(request, f'Removed {target.user.username}.')
+    return redirect('conversation', pk=pk)
+
+
+def chat_typing(request, username=None, pk=None):
+    """Report that the viewer is typing.
+
+    The signed token from the thread page names the conversation and the
+    typist, so this never reads the session; checking that the typist is
+    still in the conversation is one indexed lookup.
+    """
+
+    if request.method != 'POST':
+        return HttpResponseForbidden()
+    signed = receipts.read_typing_token(request.POST.get('token', ''))
+    if signed is None:
+        return HttpResponseForbidden()
+    receipts.typing(*signed)
+    return HttpResponse(status=204)
+
+
+@sync_to_async
+def _stream_participant(request, username=None, pk=None):
+    """Return ``(viewer_id, conversation_id)`` if the viewer may follow this chat."""
+
+    if not request.user.is_authenticated:
+        return None
+    if pk is not None:
+        member = ConversationMember.objects.filter(conversation_id=pk, user=request.user).first()
+        if member is None:
+            return None
+        if member.other_user_id and member.other_user_id not in get_friend_ids(request.user):
+            return None
+        return request.user.pk, pk
+    target_user = get_user_model().objects.filter(username=username).first()
+    if target_user is None or not is_friend(request.user, target_user):
+        return None
+    conversation, _ = Conversation.between(request.user, target_user)
+    return request.user.pk, conversation.pk
+
+
+async def chat_stream(request, username=None, pk=None):
+    """Server-Sent Events stream of new messages in a conversation."""
+
+    if not isinstance(request, ASGIRequest):
+        # Streaming needs an ASGI server; 204 tells EventSource not to reconnect
+        return HttpResponse(status=204)
+    participant = await _stream_participant(request, username, pk)
+    if participant is None:
+        return HttpResponseForbidden()
+    viewer_id, conversation_id = participant
+    response = StreamingHttpResponse(
+        realtime.event_stream(realtime.conversation_channel(conversation_id), viewer_id),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response